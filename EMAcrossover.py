@@ -8,69 +8,54 @@ except ModuleNotFoundError:
     from nepse_scraper import Nepse_scraper
 
 # -------------------- Imports --------------------
+import sys
 import pandas as pd
 import numpy as np
 import requests
-import re
 from datetime import datetime
+from adjustments import AdjustmentEngine, load_actions, save_actions, ACTIONS_FILE
+from breadth import BREADTH_FILE, update_breadth, save_breadth
+from github_utils import read_published_csv
+from trading_calendar import TradingCalendar, EXTEND_SESSIONS
+from pipeline import SIGNAL_ORDER, restore_raw
+from ranks import add_ranks, top_n
+from backend import get_backend
+from export import SIGNALS_SCHEMA, format_frame, write_outputs
+from fetch import fetch_today_price
+from ledger import RunLedger, content_hash, file_hash, business_date_of
+from decoder import decode_today_price
+from manifest import latest_url, publish_outputs
+from correlation import PEERS_FILE, update_correlation
+from anomaly import ANOMALY_FILE, update_anomalies
+from signal_history import SIGNAL_HISTORY_FILE, STREAKS_FILE, update_signal_history
+from alerts import AlertIndex, load_watchlists, changed_signals, load_state, save_state, write_alert_batch, deliver_webhooks
 
 # -------------------- Config --------------------
 COLUMNS = ['Symbol', 'Date', 'Open', 'Close', 'Volume']
-REPO_URL = "https://api.github.com/repos/ChintanKoirala/NepseAnalysis/contents/daily_data"
-RAW_BASE = "https://raw.githubusercontent.com/ChintanKoirala/NepseAnalysis/main/daily_data"
-RSI_PERIOD = 14
-
-# -------------------- Fetch Latest GitHub CSV --------------------
-def get_latest_combined_url():
-    try:
-        resp = requests.get(REPO_URL)
-        resp.raise_for_status()
-        files = resp.json()
-        combined_files = [f["name"] for f in files if f["name"].startswith("combined_nepse_") and f["name"].endswith(".csv")]
-        if not combined_files:
-            raise ValueError("No combined_nepse_*.csv file found in repo")
-        dates = []
-        for fname in combined_files:
-            match = re.search(r"combined_nepse_(\d{4}-\d{2}-\d{2})\.csv", fname)
-            if match:
-                dates.append((match.group(1), fname))
-        latest_date, latest_file = max(dates, key=lambda x: x[0])
-        print(f"📂 Latest GitHub file found: {latest_file}")
-        return f"{RAW_BASE}/{latest_file}"
-    except Exception as e:
-        print(f"⚠️ Failed to fetch latest combined file: {e}")
-        return None
-
-LATEST_URL = get_latest_combined_url()
+EXTRA_OUTPUTS = []  # any of 'gzip', 'zstd', 'parquet', written next to the CSV
+ALIGN_TO_SESSIONS = False  # True: rolling windows count trading sessions, not rows
+WORKERS = 1  # >1 shards the symbols over that many worker processes
+BACKEND = 'pandas'  # or 'polars' (lazy queries; falls back to pandas if not installed)
 
 # -------------------- Fetch Today's NEPSE Data --------------------
-# Fix SSL verification error by disabling SSL check
-scraper = Nepse_scraper(verify_ssl=False)
-
-try:
-    today_data = scraper.get_today_price()
-    if isinstance(today_data, dict):
-        content = today_data.get('content', [])
-    elif isinstance(today_data, list):
-        content = today_data
-    else:
-        content = []
-except Exception as e:
-    print(f"⚠️ Failed to fetch today's NEPSE data: {e}")
-    content = []
+# bounded by FETCH_DEADLINE; falls back to the last good snapshot if NEPSE does not answer
+content, fetch_source = fetch_today_price(lambda: Nepse_scraper(verify_ssl=False))
+
+# -------------------- Run Ledger --------------------
+# a payload that was already turned into published output is not fetched from GitHub or processed again
+ledger = RunLedger("EMAcrossover", business_date_of(content))
+payload_digest = content_hash(content)
+if content and ledger.unchanged('compute', payload_digest) and ledger.unchanged('publish', ledger.output_of('compute')):
+    ledger.skip('compute', f"payload for {ledger.business_date} is unchanged")
+    ledger.skip('publish', "output for this payload is already published")
+    ledger.report()
+    sys.exit(0)
+
+# the manifest names the newest combined file, so daily_data is not listed
+LATEST_URL = latest_url("combined_nepse")
 
 # -------------------- Process Today's Data --------------------
-filtered_data = [
-    {
-        'Symbol': item.get('symbol', ''),
-        'Date': item.get('businessDate', ''),
-        'Open': item.get('openPrice', 0),
-        'Close': item.get('closePrice', 0),
-        'Volume': item.get('totalTradedQuantity', 0)
-    } for item in content
-]
-
-df_today = pd.DataFrame(filtered_data, columns=COLUMNS)
+df_today = decode_today_price(content)[COLUMNS]
 if not df_today.empty:
     today_file = f"nepse_{datetime.now().strftime('%Y-%m-%d')}.csv"
     df_today.to_csv(today_file, index=False)
@@ -78,128 +63,111 @@ if not df_today.empty:
 else:
     print("⚠️ No data available for today.")
 
-# -------------------- Standard RSI Calculation --------------------
-def calculate_rsi_standard(prices, period=14):
-    prices = pd.Series(prices).astype(float).reset_index(drop=True)
-    rsi = pd.Series([np.nan] * len(prices))
-    if len(prices) < period + 1:
-        return rsi
-    for i in range(period, len(prices)):
-        window = prices[i - period:i + 1]
-        deltas = window.diff().dropna()
-        gains = deltas[deltas > 0].sum()
-        losses = -deltas[deltas < 0].sum()
-        avg_gain = gains / period
-        avg_loss = losses / period
-        if avg_loss == 0:
-            rsi_val = 100.0
-        elif avg_gain == 0:
-            rsi_val = 0.0
-        else:
-            rs = avg_gain / avg_loss
-            rsi_val = 100 - (100 / (1 + rs))
-        rsi.iloc[i] = round(rsi_val, 1)
-    return rsi
-
 # -------------------- Merge and Process --------------------
+held_back = set()  # local files that must not be published this run
+adj_engine = None
 if not df_today.empty and LATEST_URL:
     try:
         df_latest = pd.read_csv(LATEST_URL)
         df_latest = df_latest[[col for col in COLUMNS if col in df_latest.columns]]
 
         # Combine old + today
-        df_combined = pd.concat([df_latest, df_today], ignore_index=True)
-        df_combined.drop_duplicates(subset=['Symbol', 'Date'], keep='last', inplace=True)
-        df_combined['Date'] = pd.to_datetime(df_combined['Date'], errors='coerce')
-        df_combined.sort_values(by=['Symbol','Date'], inplace=True)
-
-        result_list = []
-        for symbol, group in df_combined.groupby('Symbol'):
-            group = group.copy()
-            group['Avg_Vol_9D'] = group['Volume'].rolling(9).mean()
-            group['MA_3D'] = group['Close'].rolling(3).mean()
-            group['MA_9D'] = group['Close'].rolling(9).mean()
-            group['Vol_Ratio'] = group['Volume'] / group['Avg_Vol_9D']
-
-            if len(group) >= RSI_PERIOD + 3:
-                rsi_series = calculate_rsi_standard(group['Close'].values, period=RSI_PERIOD)
-                group['RSI_14D_Last'] = np.nan
-                group['RSI_14D_1DayBefore'] = np.nan
-                group['RSI_14D_2DaysBefore'] = np.nan
-
-                group.iloc[-1, group.columns.get_loc('RSI_14D_Last')] = rsi_series.iloc[-1]
-                group.iloc[-1, group.columns.get_loc('RSI_14D_1DayBefore')] = rsi_series.iloc[-2]
-                group.iloc[-1, group.columns.get_loc('RSI_14D_2DaysBefore')] = rsi_series.iloc[-3]
-
-                # Remarks logic
-                def update_remarks(row):
-                    rsi_last = row['RSI_14D_Last']
-                    rsi_prev1 = row['RSI_14D_1DayBefore']
-                    rsi_prev2 = row['RSI_14D_2DaysBefore']
-                    ma3, ma9 = row['MA_3D'], row['MA_9D']
-                    vol_ratio = row['Vol_Ratio']
-                    vol, avg_vol = row['Volume'], row['Avg_Vol_9D']
-                    remark = ''
-
-                    # Buy Zone
-                    if ma3 >= ma9 and vol_ratio >= 0.4:
-                        if (rsi_last < 60) and (rsi_last > rsi_prev1 > rsi_prev2) and (vol_ratio >= 1.5):
-                            remark = 'Very Strong Buy'
-                        elif (rsi_last < 60) and (rsi_last > rsi_prev1 > rsi_prev2) and (vol_ratio >= 1.0):
-                            remark = 'Strong Buy'
-                        elif rsi_last >= 60:
-                            remark = 'Overbought – Ready to Sell'
-                        else:
-                            remark = 'Buy Zone'
-                    # Sell Zone
-                    elif ma3 <= ma9 and vol_ratio < 3.0:
-                        if (rsi_last < 70) and (rsi_last < rsi_prev1 < rsi_prev2) and (vol <= 0.7 * avg_vol):
-                            remark = 'Very Strong Sell'
-                        elif (rsi_last < 70) and (rsi_last < rsi_prev1 < rsi_prev2) and (vol <= avg_vol):
-                            remark = 'Strong Sell'
-                        else:
-                            remark = 'Sell Zone'
-                    else:
-                        remark = 'Hold'
-                    return remark
-
-                group['Remarks'] = group.apply(update_remarks, axis=1)
-                result_list.append(group.iloc[[-1]])
-
-        df_lastday = pd.concat(result_list, ignore_index=True) if result_list else pd.DataFrame(columns=[
-            'Symbol','Date','Open','Close','Volume','Avg_Vol_9D','MA_3D','MA_9D',
-            'RSI_14D_Last','RSI_14D_1DayBefore','RSI_14D_2DaysBefore','Remarks'
-        ])
+        backend = get_backend(BACKEND, WORKERS, ALIGN_TO_SESSIONS)
+        df_combined = backend.merge_history([df_latest, df_today])
+
+        # indicators run on prices adjusted for bonus/rights/splits; df_combined itself stays raw
+        adj_engine = AdjustmentEngine(load_actions(), df_combined)
+        df_adjusted = adj_engine.adjusted(df_combined)
+
+        if adj_engine.changed:
+            save_actions(adj_engine.actions)
+
+        # session index of the merged history; reports symbols that skipped sessions
+        calendar = TradingCalendar.from_history(df_combined['Date'])
+        missing = calendar.missing_sessions(df_combined)
+        print(f"📅 {len(calendar.sessions) - EXTEND_SESSIONS} sessions, {missing['Symbol'].nunique()} symbols with {len(missing)} missing sessions")
+
+        # one row per symbol (pandas: serially or sharded over WORKERS processes)
+        df_lastday = backend.signal_rows(df_adjusted, calendar=calendar if ALIGN_TO_SESSIONS else None)
+        df_lastday = restore_raw(df_lastday, df_combined).reset_index(drop=True)
+
+        # where each symbol stands against the whole market that day (0 = not enough history)
+        df_lastday = add_ranks(df_lastday, df_adjusted)
+        leaders = top_n(df_lastday, 'Mom_5D_Rank', 5, largest=False)['Symbol'].tolist()
+        print(f"📈 5-day momentum leaders: {', '.join(leaders)}")
 
         # Sort and format
-        signal_order = [
-            'Very Strong Buy', 'Strong Buy', 'Overbought – Ready to Sell',
-            'Very Strong Sell', 'Strong Sell',
-            'Buy Zone', 'Sell Zone', 'Hold'
-        ]
-        df_lastday['Remarks'] = pd.Categorical(df_lastday['Remarks'], categories=signal_order, ordered=True)
+        df_lastday['Remarks'] = pd.Categorical(df_lastday['Remarks'], categories=SIGNAL_ORDER, ordered=True)
         df_lastday.sort_values(by=['Remarks','Symbol'], inplace=True)
 
-        df_lastday['Date'] = pd.to_datetime(df_lastday['Date']).dt.strftime('%Y-%m-%d')
-        df_lastday['Avg_Vol_9D'] = df_lastday['Avg_Vol_9D'].fillna(0).astype(int)
-        df_lastday['MA_3D'] = df_lastday['MA_3D'].round(2)
-        df_lastday['MA_9D'] = df_lastday['MA_9D'].round(2)
-        df_lastday['RSI_14D_Last'] = df_lastday['RSI_14D_Last'].round(1)
-        df_lastday['RSI_14D_1DayBefore'] = df_lastday['RSI_14D_1DayBefore'].round(1)
-        df_lastday['RSI_14D_2DaysBefore'] = df_lastday['RSI_14D_2DaysBefore'].round(1)
-
-        df_lastday = df_lastday[['Symbol','Date','Open','Close','Volume','Avg_Vol_9D','MA_3D','MA_9D',
-                                 'RSI_14D_Last','RSI_14D_1DayBefore','RSI_14D_2DaysBefore','Remarks']]
-        df_lastday.reset_index(drop=True, inplace=True)
-        df_lastday.index += 1
-        df_lastday.index.name = 'S.N.'
-
-        df_lastday.to_csv("filtered_nepse_signals.csv", index=True)
+        df_lastday = format_frame(df_lastday, SIGNALS_SCHEMA)
+        write_outputs(df_lastday, "filtered_nepse_signals.csv", EXTRA_OUTPUTS)
+        ledger.record('compute', payload_digest, file_hash("filtered_nepse_signals.csv"))
         print("✅ File 'filtered_nepse_signals.csv' saved successfully with SSL fix.")
 
     except Exception as e:
         print(f"⚠️ Failed to process and calculate: {e}")
 
+    # -------------------- Market Breadth --------------------
+    # extends the published breadth series with the new trading days only; it is built from the
+    # merged history only when none is published yet (404). If the published series cannot be
+    # read, nothing is saved, so a partial rebuild is never published over the full series
+    try:
+        breadth = update_breadth(read_published_csv(BREADTH_FILE), df_adjusted, remarks=df_lastday['Remarks'])
+        save_breadth(breadth)
+    except Exception as e:
+        print(f"⚠️ Failed to update market breadth, published '{BREADTH_FILE}' left unchanged: {e}")
+        # the payload is not marked as done, so a rerun of it updates the breadth
+        ledger.revert('compute')
+
+    # -------------------- Return Correlation & Peers --------------------
+    # the saved window is moved by the new days only; re-adjusted prices force a rebuild
+    try:
+        corr = update_correlation(df_adjusted, refit=adj_engine.changed)
+        corr.top_peers().to_csv(PEERS_FILE, index=False)
+        print(f"✅ Top correlated peers saved as '{PEERS_FILE}'")
+    except Exception as e:
+        print(f"⚠️ Failed to update return correlations: {e}")
+
+    # -------------------- Volume / Return Anomalies --------------------
+    # online per-symbol statistics, moved by the new days only
+    try:
+        anomalies = update_anomalies(df_adjusted, refit=adj_engine.changed)
+        if anomalies is not None:
+            anomalies.to_csv(ANOMALY_FILE, index=False)
+            print(f"✅ {len(anomalies)} anomalies saved as '{ANOMALY_FILE}'")
+    except Exception as e:
+        print(f"⚠️ Failed to update anomaly statistics: {e}")
+
+    # -------------------- Signal History --------------------
+    # today's Remarks extend each symbol's current run or start a new one
+    try:
+        history = update_signal_history(df_lastday)
+        history.current_streaks().to_csv(STREAKS_FILE, index=False)
+        print(f"✅ Current signal streaks saved as '{STREAKS_FILE}'")
+    except Exception as e:
+        print(f"⚠️ Failed to update signal history, published '{SIGNAL_HISTORY_FILE}' left unchanged: {e}")
+        # an unreadable local copy is not published either; a rerun of the payload updates the history
+        held_back.update([SIGNAL_HISTORY_FILE, STREAKS_FILE])
+        ledger.revert('compute')
+
+    # -------------------- Watchlist Alerts --------------------
+    # only the subscribers of symbols whose signal changed since the last run are matched
+    try:
+        watch_rules = load_watchlists()
+        if not watch_rules.empty:
+            changed = changed_signals(df_lastday, load_state())
+            alerts = AlertIndex(watch_rules).match(changed)
+            print(f"ℹ️ {len(changed)} of {len(df_lastday)} symbols changed since the last run")
+            if not alerts.empty:
+                write_alert_batch(alerts, f"alerts_{df_lastday['Date'].max()}.csv")
+                deliver_webhooks(alerts)
+            else:
+                print("ℹ️ No watchlist alerts today.")
+            save_state(df_lastday)
+    except Exception as e:
+        print(f"⚠️ Failed to match watchlist alerts: {e}")
+
 
 # upload output files in github ripo
 
@@ -237,69 +205,24 @@ else:
         sys.exit(1)
 
 repo_file = f"daily_data/filtered_nepse_signals_{last_traded_date}.csv"
-upload_url = f"https://api.github.com/repos/{repo}/contents/{repo_file}"
 
 print(f"✅ Found filtered signals file: {local_file}")
 
-# -------------------- GitHub Token --------------------
-token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_PAT")
-if not token:
-    print("❌ GitHub token not found. Set GITHUB_TOKEN (Actions) or GH_PAT (local).")
-    sys.exit(1)
-else:
-    print("✅ Using GitHub token.")
-
-headers = {
-    "Authorization": f"Bearer {token}",
-    "Accept": "application/vnd.github.v3+json"
-}
-
-# -------------------- Read & encode file --------------------
-try:
-    with open(local_file, "rb") as f:
-        content = f.read()
-    encoded_content = base64.b64encode(content).decode()
-    print(f"ℹ️ File '{local_file}' read successfully.")
-except Exception as e:
-    print(f"❌ Failed to read '{local_file}': {e}")
-    sys.exit(1)
-
-# -------------------- Check if file exists in repo --------------------
-sha = None
-try:
-    response = requests.get(upload_url, headers=headers)
-    if response.status_code == 200:
-        sha = response.json().get("sha")
-        print(f"ℹ️ File '{repo_file}' exists. It will be updated.")
-    elif response.status_code == 404:
-        print(f"ℹ️ File '{repo_file}' does not exist. It will be created.")
-    else:
-        print(f"⚠️ Unexpected status {response.status_code} when checking repo.")
-        print(response.json())
-except Exception as e:
-    print(f"⚠️ Failed to check file in repo: {e}")
-
-# -------------------- Upload / Update --------------------
-payload = {
-    "message": f"Upload filtered_nepse_signals file for {last_traded_date}",
-    "content": encoded_content,
-    "branch": branch
+# -------------------- Publish --------------------
+# one commit with everything this run produced; a file identical to its last upload is left out
+# (an unchanged signals file no longer stops the other outputs from being published)
+outputs = {
+    repo_file: (local_file, 'publish'),
+    f"daily_data/{BREADTH_FILE}": (BREADTH_FILE, 'publish_breadth'),
+    f"daily_data/{PEERS_FILE}": (PEERS_FILE, 'publish_peers'),
+    f"daily_data/{ANOMALY_FILE}": (ANOMALY_FILE, 'publish_anomalies'),
+    f"daily_data/{SIGNAL_HISTORY_FILE}": (SIGNAL_HISTORY_FILE, 'publish_signal_history'),
+    f"daily_data/{STREAKS_FILE}": (STREAKS_FILE, 'publish_streaks'),
 }
-if sha:
-    payload["sha"] = sha
-
-try:
-    response = requests.put(upload_url, headers=headers, json=payload)
-    if response.status_code in [200, 201]:
-        print(f"✅ File '{repo_file}' uploaded successfully!")
-    else:
-        print(f"❌ Upload failed. Status: {response.status_code}")
-        print(response.json())
-except Exception as e:
-    print(f"❌ Exception during upload: {e}")
-
-
-
-
-
+outputs = {repo: (local, stage) for repo, (local, stage) in outputs.items() if local not in held_back}
+# newly frozen corporate action factors
+if adj_engine is not None and adj_engine.changed:
+    outputs[ACTIONS_FILE] = (ACTIONS_FILE, 'publish_actions')
 
+publish_outputs(ledger, outputs, f"Publish EMAcrossover outputs for {last_traded_date}")
+ledger.report()
@@ -0,0 +1,149 @@
+# this code adjusts prices and volumes for bonus shares, rights issues and splits without touching the raw history
+
+# -------------------- Imports --------------------
+import os
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+ACTIONS_FILE = "corporate_actions.csv"
+# Ratio: bonus / rights are in percent (10 = 10%), split is new shares per old share (2 = 1:2)
+ACTION_COLUMNS = ['Symbol', 'Ex_Date', 'Action', 'Ratio', 'Rights_Price', 'Factor']
+
+def load_actions(file_name=ACTIONS_FILE):
+    if not os.path.exists(file_name):
+        return pd.DataFrame(columns=ACTION_COLUMNS)
+    actions = pd.read_csv(file_name)
+    for col in ACTION_COLUMNS:
+        if col not in actions.columns:
+            actions[col] = np.nan
+    return actions[ACTION_COLUMNS]
+
+def save_actions(actions, file_name=ACTIONS_FILE):
+    actions.sort_values(by=['Symbol', 'Ex_Date']).to_csv(file_name, index=False)
+
+# -------------------- Price Factor of One Action --------------------
+# factor multiplies prices before the ex-date; volumes are divided by it
+def action_factor(action, ratio, rights_price=None, cum_price=None):
+    action = str(action).strip().lower()
+    ratio = float(ratio)
+    if action == 'bonus':
+        return 1 / (1 + ratio / 100)
+    if action == 'split':
+        return 1 / ratio
+    if action == 'rights':
+        if cum_price is None or pd.isna(cum_price) or pd.isna(rights_price):
+            raise ValueError("rights issue needs the rights price and the last cum-rights close")
+        r = ratio / 100
+        terp = (cum_price + r * float(rights_price)) / (1 + r)
+        return terp / cum_price
+    raise ValueError(f"Unknown corporate action '{action}'")
+
+# -------------------- Adjustment Engine --------------------
+# changed: the adjusted history differs from the last run's, because a factor was fixed or an
+# action went ex in the newest session (prices before it are scaled from this run on), so state
+# built from adjusted prices has to be refit
+class AdjustmentEngine:
+    def __init__(self, actions, panel=None):
+        self.actions = actions.copy()
+        self.actions['Ex_Date'] = pd.to_datetime(self.actions['Ex_Date'])
+        self.panel = panel
+        self._vectors = {}
+        self.changed = False
+        self._fill_factors(self.actions.index)
+        self._mark_new_ex_dates()
+
+    # rights factors depend on the cum-rights close, so every factor is frozen in the table once known;
+    # that keeps it valid after the close has rolled out of the merged window. Rights are announced
+    # ahead of the ex-date: their factor stays NaN until the panel has a session on or after it,
+    # so the close used really is the last cum-rights one
+    def _fill_factors(self, index):
+        for i in index:
+            row = self.actions.loc[i]
+            if pd.notna(row['Factor']):
+                continue
+            if str(row['Action']).lower() == 'rights' and not self._ex_date_reached(row['Ex_Date']):
+                print(f"ℹ️ Rights for {row['Symbol']} go ex on {row['Ex_Date']:%Y-%m-%d}, factor not fixed yet")
+                continue
+            cum_price = self._cum_price(row['Symbol'], row['Ex_Date']) if str(row['Action']).lower() == 'rights' else None
+            try:
+                self.actions.loc[i, 'Factor'] = action_factor(row['Action'], row['Ratio'], row['Rights_Price'], cum_price)
+                self.changed = True
+            except ValueError as e:
+                print(f"⚠️ Skipping {row['Action']} for {row['Symbol']} on {row['Ex_Date']:%Y-%m-%d}: {e}")
+
+    # actions recorded ahead of time only take effect once their ex-date enters the panel: that is
+    # the session added by this run (each run adds one), i.e. after the one before the newest
+    def _mark_new_ex_dates(self):
+        if self.panel is None or self.actions.empty:
+            return
+        sessions = np.sort(pd.to_datetime(self.panel['Date']).dropna().unique())
+        if len(sessions) < 2:
+            return
+        acts = self.actions
+        went_ex = acts[acts['Factor'].notna() & (acts['Ex_Date'] > sessions[-2]) & (acts['Ex_Date'] <= sessions[-1])]
+        for _, row in went_ex.iterrows():
+            print(f"ℹ️ {row['Action']} for {row['Symbol']} went ex on {row['Ex_Date']:%Y-%m-%d}, adjusted history changed")
+            self.changed = True
+
+    def _ex_date_reached(self, ex_date):
+        return self.panel is not None and (pd.to_datetime(self.panel['Date']) >= ex_date).any()
+
+    def _cum_price(self, symbol, ex_date):
+        if self.panel is None:
+            return None
+        rows = self.panel[(self.panel['Symbol'] == symbol) & (pd.to_datetime(self.panel['Date']) < ex_date)]
+        if rows.empty:
+            return None
+        return float(rows.sort_values(by='Date')['Close'].iloc[-1])
+
+    def record_action(self, symbol, ex_date, action, ratio, rights_price=np.nan):
+        row = pd.DataFrame([{
+            'Symbol': symbol, 'Ex_Date': pd.to_datetime(ex_date), 'Action': action,
+            'Ratio': ratio, 'Rights_Price': rights_price, 'Factor': np.nan
+        }])
+        self.actions = pd.concat([self.actions, row], ignore_index=True)
+        self._fill_factors(self.actions.index[-1:])
+        # only the symbol that got the new action has to rebuild its vector
+        self._vectors.pop(symbol, None)
+
+    # per-symbol step function: ex-dates and the cumulative factor that applies before each of them
+    def factor_vector(self, symbol):
+        if symbol not in self._vectors:
+            acts = self.actions[(self.actions['Symbol'] == symbol) & self.actions['Factor'].notna()]
+            acts = acts.sort_values(by='Ex_Date')
+            ex_dates = acts['Ex_Date'].values.astype('datetime64[ns]')
+            # cum[i] = product of factors of actions i..end, cum[len] = 1 for dates after the last action
+            cum = np.append(np.cumprod(acts['Factor'].values[::-1].astype(float))[::-1], 1.0)
+            self._vectors[symbol] = (ex_dates, cum)
+        return self._vectors[symbol]
+
+    def factors(self, symbols, dates):
+        symbols = np.asarray(symbols)
+        dates = pd.to_datetime(pd.Series(dates)).values.astype('datetime64[ns]')
+        out = np.ones(len(symbols))
+        if len(dates) == 0:
+            return out
+        last = dates.max()
+        for symbol in np.intersect1d(np.unique(symbols), self.actions['Symbol'].unique()):
+            mask = symbols == symbol
+            ex_dates, cum = self.factor_vector(symbol)
+            # relative to the newest date, so actions that have not gone ex yet change nothing
+            out[mask] = cum[np.searchsorted(ex_dates, dates[mask], side='right')] / cum[np.searchsorted(ex_dates, last, side='right')]
+        return out
+
+    # -------------------- Adjusted View --------------------
+    # shallow copy: only the adjusted price/volume columns are new arrays, every other column is
+    # shared with the panel passed in, which is left as it is
+    def adjusted(self, panel, price_columns=('Open', 'High', 'Low', 'Close'), volume_columns=('Volume',)):
+        adjusted = panel.copy(deep=False)
+        if self.actions.empty:
+            return adjusted
+        factor = self.factors(panel['Symbol'].values, panel['Date'].values)
+        for col in price_columns:
+            if col in adjusted.columns:
+                adjusted[col] = pd.to_numeric(adjusted[col], errors='coerce') * factor
+        for col in volume_columns:
+            if col in adjusted.columns:
+                adjusted[col] = pd.to_numeric(adjusted[col], errors='coerce') / factor
+        return adjusted
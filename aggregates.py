@@ -0,0 +1,82 @@
+# this code keeps weekly and monthly OHLCV bars per symbol, updated one trading day at a time
+
+# -------------------- Imports --------------------
+import pandas as pd
+import numpy as np
+from indicators import add_moving_averages, add_rsi
+
+# -------------------- Config --------------------
+# a week bucket runs Sunday..Saturday so one trading week never straddles two buckets
+TIMEFRAMES = {
+    'weekly': {'freq': 'W-SAT', 'unit': 'W', 'file': 'weekly_nepse.csv'},
+    'monthly': {'freq': 'M', 'unit': 'M', 'file': 'monthly_nepse.csv'},
+}
+BAR_COLUMNS = ['Symbol', 'Period', 'Start_Date', 'End_Date',
+               'Open', 'High', 'Low', 'Close', 'Volume', 'Days']
+
+def period_labels(dates, freq):
+    return pd.to_datetime(pd.Series(dates)).dt.to_period(freq).astype(str).values
+
+def _prepare_daily(df):
+    df = df.copy()
+    for col in ['High', 'Low']:
+        if col not in df.columns:
+            df[col] = np.nan
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date'])
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+# -------------------- Full Build (bootstrap only) --------------------
+def build_bars(df, freq):
+    df = _prepare_daily(df).sort_values(by=['Symbol', 'Date'])
+    if df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    df['Period'] = period_labels(df['Date'], freq)
+    bars = df.groupby(['Symbol', 'Period'], sort=True).agg(
+        Start_Date=('Date', 'min'),
+        End_Date=('Date', 'max'),
+        Open=('Open', 'first'),
+        High=('High', 'max'),
+        Low=('Low', 'min'),
+        Close=('Close', 'last'),
+        Volume=('Volume', 'sum'),
+        Days=('Date', 'count'),
+    ).reset_index()
+    bars['Start_Date'] = bars['Start_Date'].dt.strftime('%Y-%m-%d')
+    bars['End_Date'] = bars['End_Date'].dt.strftime('%Y-%m-%d')
+    return bars[BAR_COLUMNS]
+
+# -------------------- Incremental Update --------------------
+# the buckets the new dates fall into are rebuilt from the daily rows (the merged history covers
+# the current week and month); closed buckets are left as they are. Rebuilding instead of adding
+# the day on top means a rerun of the same date with corrected prices replaces that day
+def update_bars(bars, daily, freq, dates=None):
+    daily = _prepare_daily(daily)
+    if bars is None or bars.empty:
+        return build_bars(daily, freq)
+    dates = daily['Date'] if dates is None else pd.to_datetime(pd.Series(dates), errors='coerce').dropna()
+    labels = np.unique(period_labels(dates, freq))
+    rebuilt = build_bars(daily[np.isin(period_labels(daily['Date'], freq), labels)], freq)
+    kept = bars.loc[~bars['Period'].astype(str).isin(labels), BAR_COLUMNS]
+    parts = [part for part in [kept, rebuilt] if not part.empty]
+    return pd.concat(parts, ignore_index=True) if parts else kept
+
+# -------------------- Multi-timeframe Indicators --------------------
+# runs the same indicator code as the daily scripts on weekly/monthly bars (MA_3W, RSI_14M, ...);
+# the indicator columns are written next to the bars and recomputed after every update
+def bar_indicators(bars, unit):
+    bars = bars[BAR_COLUMNS].sort_values(by=['Symbol', 'Period'], kind='stable')
+    result_list = []
+    for symbol, group in bars.groupby('Symbol'):
+        group = add_moving_averages(group.copy(), unit=unit)
+        group = add_rsi(group, unit=unit)
+        result_list.append(group)
+    return pd.concat(result_list, ignore_index=True) if result_list else bars
+
+# -------------------- Save --------------------
+def save_bars(bars, file_name):
+    bars = bars.sort_values(by=['Symbol', 'Period'], kind='stable')
+    bars.to_csv(file_name, index=False)
+    print(f"✅ Bars saved as '{file_name}' ({len(bars)} rows)")
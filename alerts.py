@@ -0,0 +1,107 @@
+# this code matches each day's signals against the watchlists, looking rules up by symbol
+
+# -------------------- Imports --------------------
+import os
+import json
+import requests
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+# one rule per row; empty condition cells are ignored, filled ones must all hold.
+# Remarks may list several classes separated by '|'
+WATCHLIST_FILE = "watchlists.csv"
+WATCHLIST_COLUMNS = ['User', 'Symbol', 'Remarks', 'RSI_Below', 'RSI_Above', 'Vol_Ratio_Above', 'Webhook']
+ALERT_STATE_FILE = "alert_state.csv"
+OUTBOX_FILE = "alerts_outbox.jsonl"
+STATE_COLUMNS = ['Symbol', 'Remarks', 'RSI_14D_Last', 'Vol_Ratio']
+
+def load_watchlists(file_name=WATCHLIST_FILE):
+    if not os.path.exists(file_name):
+        return pd.DataFrame(columns=WATCHLIST_COLUMNS)
+    rules = pd.read_csv(file_name, dtype={'User': str, 'Symbol': str, 'Remarks': str, 'Webhook': str})
+    for col in WATCHLIST_COLUMNS:
+        if col not in rules.columns:
+            rules[col] = np.nan
+    return rules[WATCHLIST_COLUMNS]
+
+# -------------------- Inverted Index --------------------
+# symbol -> positions of its rules, so a day's matching only touches the rules of the symbols
+# that changed; rules with several Remarks classes are expanded to one row per class
+class AlertIndex:
+    def __init__(self, rules):
+        rules = rules.reset_index(drop=True).copy()
+        rules['Rule_ID'] = rules.index
+        rules['Symbol'] = rules['Symbol'].str.strip().str.upper()
+        rules['Remarks'] = rules['Remarks'].str.split('|')
+        rules = rules.explode('Remarks')
+        rules['Remarks'] = rules['Remarks'].str.strip().replace('', np.nan)
+        self.rules = rules.reset_index(drop=True)
+        self.by_symbol = self.rules.groupby('Symbol').indices
+        print(f"ℹ️ Alert index: {rules['Rule_ID'].nunique()} rules on {len(self.by_symbol)} symbols")
+
+    def subscribers(self, symbols):
+        positions = [self.by_symbol[s] for s in symbols if s in self.by_symbol]
+        if not positions:
+            return self.rules.iloc[0:0]
+        return self.rules.iloc[np.concatenate(positions)]
+
+    def match(self, signals):
+        rules = self.subscribers(signals['Symbol'].unique())
+        signals = signals[['Symbol', 'Date', 'Remarks', 'RSI_14D_Last', 'Vol_Ratio']].astype({'Remarks': str})
+        any_class = rules[rules['Remarks'].isna()].drop(columns='Remarks').merge(signals, on='Symbol')
+        by_class = rules[rules['Remarks'].notna()].merge(signals, on=['Symbol', 'Remarks'])
+        matched = pd.concat([any_class, by_class], ignore_index=True)
+        if matched.empty:
+            return matched
+
+        ok = (matched['RSI_Below'].isna() | (matched['RSI_14D_Last'] < matched['RSI_Below']))
+        ok &= (matched['RSI_Above'].isna() | (matched['RSI_14D_Last'] > matched['RSI_Above']))
+        ok &= (matched['Vol_Ratio_Above'].isna() | (matched['Vol_Ratio'] >= matched['Vol_Ratio_Above']))
+        alerts = matched[ok].drop_duplicates(subset='Rule_ID')
+        return alerts[['User', 'Symbol', 'Date', 'Remarks', 'RSI_14D_Last', 'Vol_Ratio', 'Rule_ID', 'Webhook']] \
+            .sort_values(by=['User', 'Symbol', 'Rule_ID']).reset_index(drop=True)
+
+# -------------------- Changed Symbols --------------------
+# symbols that are new or whose Remarks / RSI / volume ratio differ from the last run
+def changed_signals(signals, state):
+    signals = signals.copy()
+    signals['Vol_Ratio'] = (signals['Volume'] / signals['Avg_Vol_9D'].replace(0, np.nan)).round(2)
+    if state is None or state.empty:
+        return signals
+    current = signals[STATE_COLUMNS].astype({'Remarks': str}).set_index('Symbol')
+    previous = state[STATE_COLUMNS].astype({'Remarks': str}).set_index('Symbol').reindex(current.index)
+    same = ((current == previous) | (current.isna() & previous.isna())).all(axis=1)
+    return signals[~signals['Symbol'].map(same).fillna(False).astype(bool).values]
+
+def load_state(file_name=ALERT_STATE_FILE):
+    return pd.read_csv(file_name) if os.path.exists(file_name) else None
+
+def save_state(signals, file_name=ALERT_STATE_FILE):
+    signals = signals.copy()
+    signals['Vol_Ratio'] = (signals['Volume'] / signals['Avg_Vol_9D'].replace(0, np.nan)).round(2)
+    signals[STATE_COLUMNS].to_csv(file_name, index=False)
+
+# -------------------- Delivery --------------------
+def write_alert_batch(alerts, file_name):
+    alerts.drop(columns=['Webhook']).to_csv(file_name, index=False)
+    print(f"✅ {len(alerts)} alerts for {alerts['User'].nunique()} users saved as '{file_name}'")
+
+# one JSON payload per user; posted to the user's Webhook when send=True, otherwise only
+# appended to the local outbox file that stands in for the webhook endpoint
+def deliver_webhooks(alerts, outbox=OUTBOX_FILE, send=False):
+    delivered = 0
+    with open(outbox, "a") as f:
+        for user, rows in alerts.groupby('User'):
+            payload = {"user": user, "alerts": json.loads(
+                rows.drop(columns=['User', 'Webhook', 'Rule_ID']).to_json(orient='records'))}
+            f.write(json.dumps(payload) + "\n")
+            hook = rows['Webhook'].dropna()
+            if send and not hook.empty:
+                try:
+                    requests.post(hook.iloc[0], json=payload, timeout=10).raise_for_status()
+                    delivered += 1
+                except Exception as e:
+                    print(f"⚠️ Webhook for {user} failed: {e}")
+    print(f"📨 Alerts for {alerts['User'].nunique()} users written to '{outbox}'"
+          + (f", {delivered} webhooks delivered" if send else ""))
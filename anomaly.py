@@ -0,0 +1,209 @@
+# this code flags volume spikes, return spikes and gap moves from per-symbol online statistics
+
+# -------------------- Imports --------------------
+import os
+import sys
+import time
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+HALFLIFE = 20          # bars for an observation's weight to halve
+MIN_OBS = 10           # bars before a symbol's z-scores are trusted
+VOLUME_Z = 3.0
+RETURN_Z = 3.0
+GAP_Z = 2.5
+GAP_MIN = 0.03         # a gap also needs to be at least 3% to be flagged
+ANOMALY_STATE_FILE = "anomaly_state.npz"
+ANOMALY_FILE = "anomalies.csv"
+
+# per-symbol state, one row per symbol: exponentially weighted mean/variance of log volume and
+# of close-to-close returns, observation counts, last close and last bar date (days since epoch)
+FIELDS = ['Vol_Mean', 'Vol_Var', 'Vol_Count', 'Ret_Mean', 'Ret_Var', 'Ret_Count', 'Last_Close', 'Last_Date']
+ANOMALY_COLUMNS = ['Symbol', 'Date', 'Close', 'Volume', 'Volume_Z', 'Return', 'Return_Z', 'Gap', 'Gap_Z',
+                   'Volume_Spike', 'Return_Spike', 'Gap_Move']
+
+def _days(dates):
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce')
+    days = dates.values.astype('datetime64[D]').astype(np.int64).astype(float)
+    days[dates.isna().values] = np.nan
+    return days
+
+# -------------------- Detector --------------------
+# Welford-style updates with exponential decay: each new bar is O(1) per symbol and all
+# symbols of a bar are updated in one vectorized step
+class AnomalyDetector:
+    def __init__(self, symbols=(), halflife=HALFLIFE):
+        self.halflife = halflife
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.symbols = []
+        self.index = {}
+        self.state = np.zeros((0, len(FIELDS)))
+        self.previous = None   # state before the last update, so the newest day can be redone
+        self._positions(symbols)
+
+    def _positions(self, symbols):
+        new = [s for s in pd.unique(pd.Series(symbols, dtype=object)) if s not in self.index]
+        if new:
+            rows = np.zeros((len(new), len(FIELDS)))
+            rows[:, FIELDS.index('Last_Close')] = np.nan
+            rows[:, FIELDS.index('Last_Date')] = np.nan
+            self.state = np.vstack([self.state, rows])
+            if self.previous is not None:
+                self.previous = np.vstack([self.previous, rows])
+            for s in new:
+                self.index[s] = len(self.symbols)
+                self.symbols.append(s)
+        return np.array([self.index[s] for s in symbols], dtype=int)
+
+    def _col(self, name, pos):
+        return self.state[pos, FIELDS.index(name)]
+
+    # z-scores of one bar per symbol against the state; the state is not changed, so intraday
+    # polls can be scored as often as needed
+    def score(self, bars):
+        pos = self._positions(bars['Symbol'].tolist())
+        volume = np.log1p(pd.to_numeric(bars['Volume'], errors='coerce').to_numpy(dtype=float))
+        close = pd.to_numeric(bars['Close'], errors='coerce').to_numpy(dtype=float)
+        open_ = pd.to_numeric(bars['Open'], errors='coerce').to_numpy(dtype=float)
+        last_close = self._col('Last_Close', pos)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = close / last_close - 1
+            gap = open_ / last_close - 1
+            vol_sd = np.sqrt(self._col('Vol_Var', pos))
+            ret_sd = np.sqrt(self._col('Ret_Var', pos))
+            vol_z = np.where(self._col('Vol_Count', pos) >= MIN_OBS, (volume - self._col('Vol_Mean', pos)) / vol_sd, np.nan)
+            trusted = self._col('Ret_Count', pos) >= MIN_OBS
+            ret_z = np.where(trusted, (ret - self._col('Ret_Mean', pos)) / ret_sd, np.nan)
+            gap_z = np.where(trusted, (gap - self._col('Ret_Mean', pos)) / ret_sd, np.nan)
+
+        out = pd.DataFrame({
+            'Symbol': bars['Symbol'].values, 'Date': bars['Date'].values,
+            'Close': close, 'Volume': bars['Volume'].values,
+            'Volume_Z': vol_z, 'Return': ret, 'Return_Z': ret_z, 'Gap': gap, 'Gap_Z': gap_z,
+        })
+        out['Volume_Spike'] = out['Volume_Z'] >= VOLUME_Z
+        out['Return_Spike'] = out['Return_Z'].abs() >= RETURN_Z
+        out['Gap_Move'] = (out['Gap_Z'].abs() >= GAP_Z) & (out['Gap'].abs() >= GAP_MIN)
+        return out
+
+    # scores, then folds one bar per symbol into the state; bars not newer than a symbol's
+    # last bar are ignored, so re-running a day does not count it twice
+    def update(self, bars):
+        pos = self._positions(bars['Symbol'].tolist())
+        dates = _days(bars['Date'])
+        last_date = self._col('Last_Date', pos)
+        fresh = np.isnan(last_date) | (dates > last_date)
+        bars, pos, dates = bars[fresh], pos[fresh], dates[fresh]
+        self.previous = self.state.copy()
+        scores = self.score(bars)
+        a = self.alpha
+
+        volume = np.log1p(pd.to_numeric(bars['Volume'], errors='coerce').to_numpy(dtype=float))
+        ret = scores['Return'].to_numpy(dtype=float)
+        for value, prefix in [(volume, 'Vol'), (ret, 'Ret')]:
+            ok = np.isfinite(value)
+            p, x = pos[ok], value[ok]
+            mean, var, count = (FIELDS.index(f'{prefix}_{f}') for f in ['Mean', 'Var', 'Count'])
+            first = self.state[p, count] == 0
+            delta = x - self.state[p, mean]
+            self.state[p, mean] = np.where(first, x, self.state[p, mean] + a * delta)
+            self.state[p, var] = np.where(first, 0.0, (1 - a) * (self.state[p, var] + a * delta * delta))
+            self.state[p, count] += 1
+
+        close = scores['Close'].to_numpy(dtype=float)
+        traded = np.isfinite(close) & (close > 0)
+        self.state[pos[traded], FIELDS.index('Last_Close')] = close[traded]
+        self.state[pos, FIELDS.index('Last_Date')] = dates
+        return scores
+
+    # replays a whole history date by date (first run, or after prices were re-adjusted)
+    def warm(self, panel):
+        panel = panel.sort_values(by=['Date', 'Symbol'])
+        scores = [self.update(bars) for _, bars in panel.groupby('Date', sort=True)]
+        return pd.concat(scores, ignore_index=True) if scores else pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+    # back to the state before the newest day (a rerun of that day with corrected prices)
+    def rollback(self):
+        if self.previous is None:
+            return False
+        self.state, self.previous = self.previous, None
+        return True
+
+    def last_date(self):
+        dates = self.state[:, FIELDS.index('Last_Date')]
+        return None if not np.isfinite(dates).any() else pd.Timestamp(int(np.nanmax(dates)), unit='D')
+
+    # -------------------- State --------------------
+    # a few floats per symbol, stored as float32
+    def save(self, file_name=ANOMALY_STATE_FILE):
+        previous = self.state if self.previous is None else self.previous
+        np.savez_compressed(file_name, symbols=np.array(self.symbols), state=self.state.astype(np.float32),
+                            previous=previous.astype(np.float32), has_previous=self.previous is not None,
+                            halflife=self.halflife)
+
+    @classmethod
+    def load(cls, file_name=ANOMALY_STATE_FILE):
+        if not os.path.exists(file_name):
+            return None
+        try:
+            data = np.load(file_name)
+            detector = cls(halflife=float(data['halflife']))
+            detector._positions(data['symbols'].tolist())
+            detector.state = data['state'].astype(float)
+            if 'previous' in data.files and bool(data['has_previous']):
+                detector.previous = data['previous'].astype(float)
+            return detector
+        except Exception as e:
+            print(f"⚠️ Could not load '{file_name}': {e}")
+            return None
+
+# -------------------- Daily Batch --------------------
+# folds the panel's days after the saved state into it; returns the flagged rows of those days.
+# A rerun of the newest day rescores it against the state from before that day; None if the
+# panel is older than the state (nothing to write)
+def update_anomalies(panel, refit=False, file_name=ANOMALY_STATE_FILE):
+    panel = panel[['Symbol', 'Date', 'Open', 'Close', 'Volume']].copy()
+    panel['Date'] = pd.to_datetime(panel['Date'], errors='coerce')
+    detector = None if refit else AnomalyDetector.load(file_name)
+    if detector is None or detector.last_date() is None:
+        detector = AnomalyDetector()
+        scores = detector.warm(panel)
+        scores = scores[scores['Date'] == panel['Date'].max()]
+        print(f"ℹ️ Anomaly state built from {panel['Date'].nunique()} days")
+    else:
+        newest = panel['Date'].max()
+        if newest < detector.last_date():
+            print(f"ℹ️ Anomaly state is already at {detector.last_date().date()}, nothing to score")
+            return None
+        if newest == detector.last_date() and not detector.rollback():
+            print(f"⚠️ No earlier anomaly state to rescore {newest.date()} against")
+            return None
+        scores = detector.warm(panel[panel['Date'] > detector.last_date()])
+        print(f"ℹ️ Anomaly state moved by {scores['Date'].nunique()} day(s)")
+    detector.save(file_name)
+    flagged = scores[scores[['Volume_Spike', 'Return_Spike', 'Gap_Move']].any(axis=1)]
+    return flagged[ANOMALY_COLUMNS].round({c: 4 for c in ['Volume_Z', 'Return', 'Return_Z', 'Gap', 'Gap_Z']}).reset_index(drop=True)
+
+# usage: python anomaly.py poll [seconds] [rounds]   (intraday: scores live prices against the saved
+# daily state without changing it)
+if __name__ == "__main__":
+    from nepse_scraper import Nepse_scraper
+    from fetch import fetch_today_price
+    from decoder import decode_today_price
+
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    detector = AnomalyDetector.load()
+    if detector is None:
+        print(f"❌ No '{ANOMALY_STATE_FILE}' yet; run the daily batch first.")
+        sys.exit(1)
+    for i in range(rounds):
+        content, _ = fetch_today_price(lambda: Nepse_scraper(verify_ssl=False))
+        scores = detector.score(decode_today_price(content))
+        flagged = scores[scores[['Volume_Spike', 'Return_Spike', 'Gap_Move']].any(axis=1)]
+        print(f"🚨 {len(flagged)} symbols flagged" if len(flagged) else "ℹ️ Nothing flagged")
+        if len(flagged):
+            print(flagged[ANOMALY_COLUMNS].round(3).to_string(index=False))
+        if i + 1 < rounds:
+            time.sleep(interval)
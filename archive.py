@@ -0,0 +1,193 @@
+# this code rolls old dated files of daily_data into one compressed archive per file type and month
+
+# -------------------- Imports --------------------
+import io
+import re
+import sys
+import gzip
+import zlib
+import hashlib
+from datetime import datetime, timedelta
+import requests
+import pandas as pd
+from github_utils import UPLOAD_FOLDER, RAW_BASE, git_blob_sha, fetch_blob, commit_files
+from manifest import MANIFEST_FILE, fetch_manifest, remove_entry, dump_manifest
+
+# -------------------- Config --------------------
+RETAIN_DAYS = 30       # dated files newer than this stay as plain CSVs in daily_data
+ARCHIVE_FOLDER = "archive"
+ARCHIVE_NAME = "{kind}_{month}.csv.gz"
+ARCHIVE_PATTERN = re.compile(r"^(?P<kind>.+)_(?P<month>\d{4}-\d{2})\.csv\.gz$")
+
+# an archive is a multi-member gzip file: one member per distinct day, sorted by date, its gzip
+# file name holding the date(s) it belongs to (days with identical bytes share one member).
+# The manifest indexes it as "archives": {type: {month: {"file", "sha", "size",
+# "days": {date: [offset, length, digest]}}}}, so one day is a ranged read + one small decompress.
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _member(dates, data):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(filename=",".join(dates) + ".csv", mode='wb', fileobj=buffer, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+def _member_dates(blob, offset):
+    flags = blob[offset + 3]
+    pos = offset + 10
+    if flags & 4:
+        pos += 2 + int.from_bytes(blob[pos:pos + 2], 'little')
+    if not flags & 8:
+        return []
+    name = blob[pos:blob.index(b"\0", pos)].decode('latin-1')
+    return name[:-len(".csv")].split(",") if name.endswith(".csv") else []
+
+# -------------------- Pack / Unpack --------------------
+# {date: csv bytes} -> (archive bytes, days index)
+def pack_archive(days):
+    groups = {}
+    for date in sorted(days):
+        groups.setdefault(_digest(days[date]), []).append(date)
+    blob, index = b"", {}
+    for digest, dates in sorted(groups.items(), key=lambda item: item[1][0]):
+        member = _member(dates, days[dates[0]])
+        for date in dates:
+            index[date] = [len(blob), len(member), digest]
+        blob += member
+    return blob, index
+
+# walks the members, so an archive can be read (and its index rebuilt) without the manifest
+def scan_archive(blob):
+    offset = 0
+    while offset < len(blob):
+        decompressor = zlib.decompressobj(31)
+        data = decompressor.decompress(blob[offset:])
+        length = len(blob) - offset - len(decompressor.unused_data)
+        yield _member_dates(blob, offset), offset, length, data
+        offset += length
+
+def unpack_archive(blob):
+    return {date: data for dates, _, _, data in scan_archive(blob) for date in dates}
+
+def index_archive(blob):
+    return {date: [offset, length, _digest(data)] for dates, offset, length, data in scan_archive(blob) for date in dates}
+
+# one day's bytes out of (part of) an archive; None if the slice does not hold that day
+def read_slice(blob, entry, offset=0):
+    start, length, digest = entry
+    try:
+        data = gzip.decompress(blob[start - offset:start - offset + length])
+    except (OSError, EOFError, zlib.error):
+        return None
+    return data if _digest(data) == digest else None
+
+# -------------------- Read a Past Day --------------------
+# plain CSV while the day is still live; otherwise only that day's member of the monthly archive
+# is downloaded (HTTP range) and decompressed
+def read_day(kind, date, manifest=None):
+    if manifest is None:
+        manifest, _ = fetch_manifest()
+    live = manifest['artifacts'].get(kind, {}).get(date)
+    if live:
+        return pd.read_csv(f"{RAW_BASE}/{live['file']}")
+
+    archive = manifest.get('archives', {}).get(kind, {}).get(date[:7])
+    if not archive or date not in archive['days']:
+        print(f"⚠️ No {kind} file for {date}, neither live nor archived")
+        return None
+    entry = archive['days'][date]
+    data = None
+    try:
+        start, length, _ = entry
+        resp = requests.get(f"{RAW_BASE}/{ARCHIVE_FOLDER}/{archive['file']}",
+                            headers={'Range': f"bytes={start}-{start + length - 1}"}, timeout=30)
+        if resp.status_code == 206:
+            data = read_slice(resp.content, entry, offset=start)
+        elif resp.status_code == 200:
+            data = read_slice(resp.content, entry)
+    except Exception as e:
+        print(f"⚠️ Ranged read of '{archive['file']}' failed: {e}")
+    # raw.githubusercontent can serve an older copy for a few minutes after a compaction
+    if data is None:
+        data = read_slice(fetch_blob(archive['sha']), entry)
+    if data is None:
+        print(f"❌ '{archive['file']}' does not match its index for {date}")
+        return None
+    print(f"📂 {kind} for {date} read from '{archive['file']}' ({entry[1]} bytes)")
+    return pd.read_csv(io.BytesIO(data))
+
+# -------------------- Compaction --------------------
+# {(type, month): [dates]} of live files older than the cutoff; the newest file of each type
+# always stays live, since the scripts read it as their starting point
+def plan_compaction(manifest, today, retain_days=RETAIN_DAYS):
+    cutoff = (today - timedelta(days=retain_days)).strftime("%Y-%m-%d")
+    plan = {}
+    for kind, entries in manifest['artifacts'].items():
+        latest = manifest['latest'].get(kind)
+        for date in sorted(entries):
+            if date < cutoff and date != latest:
+                plan.setdefault((kind, date[:7]), []).append(date)
+    return plan
+
+def add_archive(manifest, name, sha, size, days):
+    match = ARCHIVE_PATTERN.match(name)
+    if match:
+        manifest.setdefault('archives', {}).setdefault(match.group('kind'), {})[match.group('month')] = {
+            'file': name, 'sha': sha, 'size': size, 'days': days}
+
+# the files of one commit: rebuilt monthly archives, deleted live files and the new manifest
+def compaction_changes(today, retain_days=RETAIN_DAYS):
+    manifest, _ = fetch_manifest()
+    plan = plan_compaction(manifest, today, retain_days)
+    if not plan:
+        print(f"✅ No dated files older than {retain_days} days.")
+        return {}
+
+    changes = {}
+    for (kind, month), dates in sorted(plan.items()):
+        existing = manifest.get('archives', {}).get(kind, {}).get(month)
+        days = unpack_archive(fetch_blob(existing['sha'])) if existing else {}
+        for date in dates:
+            days[date] = fetch_blob(manifest['artifacts'][kind][date]['sha'])
+
+        blob, index = pack_archive(days)
+        name = ARCHIVE_NAME.format(kind=kind, month=month)
+        changes[f"{UPLOAD_FOLDER}/{ARCHIVE_FOLDER}/{name}"] = blob
+        add_archive(manifest, name, git_blob_sha(blob), len(blob), index)
+        for date in dates:
+            file_name = manifest['artifacts'][kind][date]['file']
+            changes[f"{UPLOAD_FOLDER}/{file_name}"] = None
+            remove_entry(manifest, file_name)
+        members = len(set(entry[0] for entry in index.values()))
+        print(f"🗜️ {name}: {len(dates)} files added, {len(index)} days in {members} members, {len(blob)} bytes")
+
+    changes[f"{UPLOAD_FOLDER}/{MANIFEST_FILE}"] = dump_manifest(manifest)
+    return changes
+
+def compact_daily_data(retain_days=RETAIN_DAYS, today=None):
+    today = today or datetime.now()
+    return commit_files(lambda: compaction_changes(today, retain_days),
+                        f"Archive daily files older than {retain_days} days")
+
+# usage: python archive.py compact [retain_days]
+#        python archive.py read <type> <YYYY-MM-DD> [out.csv]
+#        python archive.py list <local archive .csv.gz>
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    if command == "compact":
+        ok = compact_daily_data(int(sys.argv[2]) if len(sys.argv) > 2 else RETAIN_DAYS)
+        sys.exit(0 if ok else 1)
+    elif command == "read":
+        df = read_day(sys.argv[2], sys.argv[3])
+        if df is None:
+            sys.exit(1)
+        if len(sys.argv) > 4:
+            df.to_csv(sys.argv[4], index=False)
+            print(f"✅ Saved as '{sys.argv[4]}'")
+        else:
+            print(df.head(10).to_string(index=False))
+    elif command == "list":
+        with open(sys.argv[2], "rb") as f:
+            blob = f.read()
+        for dates, offset, length, data in scan_archive(blob):
+            print(f"{','.join(dates)}: offset {offset}, {length} bytes -> {len(data)} bytes")
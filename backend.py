@@ -0,0 +1,226 @@
+# this code runs the merge -> indicators -> signal rows steps on a chosen dataframe backend (pandas or polars)
+
+# -------------------- Imports --------------------
+import sys
+import time
+import pandas as pd
+import numpy as np
+from indicators import RSI_PERIOD
+from pipeline import SIGNAL_COLUMNS, signal_row, completedata_row, restore_raw
+from parallel import map_symbols
+from ranks import add_ranks
+from export import SIGNALS_SCHEMA, COMPLETEDATA_SCHEMA, format_frame
+
+try:
+    import polars as pl
+except ModuleNotFoundError:
+    pl = None
+
+# -------------------- Vectorized Remarks --------------------
+# same rules as pipeline.update_remarks, one np.select over all rows; NaN compares False as in Python
+def remarks_vectorized(rows):
+    rsi, prev1, prev2 = (rows[c].to_numpy(dtype=float) for c in
+                         ['RSI_14D_Last', 'RSI_14D_1DayBefore', 'RSI_14D_2DaysBefore'])
+    ma3, ma9 = rows['MA_3D'].to_numpy(dtype=float), rows['MA_9D'].to_numpy(dtype=float)
+    vol, avg_vol = rows['Volume'].to_numpy(dtype=float), rows['Avg_Vol_9D'].to_numpy(dtype=float)
+    vol_ratio = rows['Vol_Ratio'].to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        buy = (ma3 >= ma9) & (vol_ratio >= 0.4)
+        sell = ~buy & (ma3 <= ma9) & (vol_ratio < 3.0)
+        rising = (rsi < 60) & (rsi > prev1) & (prev1 > prev2)
+        falling = (rsi < 70) & (rsi < prev1) & (prev1 < prev2)
+        choices = [
+            (buy & rising & (vol_ratio >= 1.5), 'Very Strong Buy'),
+            (buy & rising & (vol_ratio >= 1.0), 'Strong Buy'),
+            (buy & (rsi >= 60), 'Overbought – Ready to Sell'),
+            (buy, 'Buy Zone'),
+            (sell & falling & (vol <= 0.7 * avg_vol), 'Very Strong Sell'),
+            (sell & falling & (vol <= avg_vol), 'Strong Sell'),
+            (sell, 'Sell Zone'),
+        ]
+    return np.select([c for c, _ in choices], [r for _, r in choices], default='Hold')
+
+# -------------------- Pandas Backend --------------------
+# the eager reference implementation: the per-symbol row builders from pipeline.py
+class PandasBackend:
+    name = 'pandas'
+
+    def __init__(self, workers=1):
+        self.workers = workers
+
+    # newest_days: keep only that many most recent dates, newest first (combined_nepse.csv layout)
+    def merge_history(self, frames, newest_days=None):
+        df = pd.concat(frames, ignore_index=True)
+        df.drop_duplicates(subset=['Symbol', 'Date'], keep='last', inplace=True)
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+        if newest_days is None:
+            df.sort_values(by=['Symbol', 'Date'], inplace=True)
+            return df
+        df.sort_values(by='Date', ascending=False, inplace=True)
+        recent_dates = df['Date'].dropna().unique()[:newest_days]
+        return df[df['Date'].isin(recent_dates)]
+
+    def signal_rows(self, panel, calendar=None):
+        rows = map_symbols(panel, signal_row, workers=self.workers, calendar=calendar)
+        return pd.concat(rows) if rows else pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    def completedata_rows(self, panel, calendar=None):
+        rows = map_symbols(panel, completedata_row, workers=self.workers, calendar=calendar)
+        return pd.concat(rows) if rows else pd.DataFrame()
+
+# -------------------- Polars Backend --------------------
+# one lazy query per step (window functions over Symbol instead of a groupby loop); polars plans
+# and runs it multi-threaded. Values that pipeline.py rounds with Python's round() are rounded
+# the same way after collect, and the zero-gain/zero-loss cases are decided on counts, so float
+# residue from rolling sums cannot change a result.
+class PolarsBackend:
+    name = 'polars'
+
+    def __init__(self, workers=1):
+        if pl is None:
+            raise ModuleNotFoundError("polars is not installed")
+
+    @staticmethod
+    def _lazy(panel):
+        return pl.from_pandas(panel.assign(_Row=panel.index.values)).lazy()
+
+    def merge_history(self, frames, newest_days=None):
+        frames = [pl.from_pandas(f.assign(Date=pd.to_datetime(f['Date'], errors='coerce'))).lazy() for f in frames]
+        lf = pl.concat(frames, how='diagonal_relaxed').unique(subset=['Symbol', 'Date'], keep='last', maintain_order=True)
+        if newest_days is None:
+            return lf.sort(['Symbol', 'Date']).collect().to_pandas()
+        recent = lf.select(pl.col('Date').drop_nulls().unique().sort(descending=True).head(newest_days))
+        return lf.join(recent, on='Date', how='semi').sort('Date', descending=True, maintain_order=True).collect().to_pandas()
+
+    @staticmethod
+    def _rsi_parts(delta, period=RSI_PERIOD):
+        by = 'Symbol'
+        return (delta.clip(lower_bound=0).rolling_sum(period).over(by),
+                (-delta.clip(upper_bound=0)).rolling_sum(period).over(by),
+                (delta > 0).cast(pl.Int32).rolling_sum(period).over(by),
+                (delta < 0).cast(pl.Int32).rolling_sum(period).over(by))
+
+    def signal_rows(self, panel, calendar=None):
+        close, volume = pl.col('Close').cast(pl.Float64), pl.col('Volume').cast(pl.Float64)
+        gains, losses, ups, downs = self._rsi_parts(close.diff().over('Symbol'))
+        rsi = (pl.when(downs == 0).then(100.0).when(ups == 0).then(0.0)
+               .otherwise(100 - 100 / (1 + gains / losses)))
+        rows = (
+            self._lazy(panel)
+            .with_columns(
+                Avg_Vol_9D=pl.col('Volume').rolling_mean(9).over('Symbol'),
+                MA_3D=close.rolling_mean(3).over('Symbol'),
+                MA_9D=close.rolling_mean(9).over('Symbol'),
+                _RSI=rsi,
+                _Pos=pl.int_range(pl.len()).over('Symbol'),
+                _N=pl.len().over('Symbol'),
+            )
+            .with_columns(
+                Vol_Ratio=volume / pl.col('Avg_Vol_9D'),
+                _RSI1=pl.col('_RSI').shift(1).over('Symbol'),
+                _RSI2=pl.col('_RSI').shift(2).over('Symbol'),
+            )
+            .filter((pl.col('_Pos') == pl.col('_N') - 1) & (pl.col('_N') >= RSI_PERIOD + 3))
+            .sort('Symbol')
+            .collect()
+            .to_pandas()
+        )
+        for src, dst in [('_RSI', 'RSI_14D_Last'), ('_RSI1', 'RSI_14D_1DayBefore'), ('_RSI2', 'RSI_14D_2DaysBefore')]:
+            rows[dst] = [round(v, 1) for v in rows[src].astype(float)]
+        rows['Remarks'] = remarks_vectorized(rows)
+        return rows.set_index('_Row').rename_axis(None).drop(columns=['_RSI', '_RSI1', '_RSI2', '_Pos', '_N'])
+
+    def completedata_rows(self, panel, calendar=None, period=RSI_PERIOD):
+        close = pl.col('Close').cast(pl.Float64)
+        lf = self._lazy(panel).sort(['Symbol', 'Date'], maintain_order=True)
+        # RSI over the non-null closes only, like rsi_last_values
+        gains, losses, ups, downs = self._rsi_parts(close.diff().over('Symbol'), period)
+        rsi = (pl.when((ups == 0) & (downs == 0)).then(50.0).when(downs == 0).then(100.0)
+               .otherwise(100 - 100 / (1 + gains / losses)))
+        rsi_rows = (
+            lf.filter(pl.col('Close').is_not_null())
+            .select('Symbol', _RSI=rsi, _Pos=pl.int_range(pl.len()).over('Symbol'), _N=pl.len().over('Symbol'))
+            .with_columns(_RSI1=pl.col('_RSI').shift(1).over('Symbol'), _RSI2=pl.col('_RSI').shift(2).over('Symbol'))
+            .filter((pl.col('_Pos') == pl.col('_N') - 1) & (pl.col('_N') >= period + 3))
+            .drop('_Pos', '_N')
+        )
+        rows = (
+            lf.with_columns(
+                Avg_Vol_9D=pl.col('Volume').rolling_mean(9).over('Symbol'),
+                MA_3D=close.rolling_mean(3).over('Symbol'),
+                MA_9D=close.rolling_mean(9).over('Symbol'),
+                _Last=pl.int_range(pl.len()).over('Symbol') == pl.len().over('Symbol') - 1,
+            )
+            .filter(pl.col('_Last'))
+            .join(rsi_rows, on='Symbol', how='inner')
+            .sort('Symbol')
+            .collect()
+            .to_pandas()
+        )
+        if rows.empty:
+            return pd.DataFrame()
+        for src, dst in [('_RSI', 'Rsi_14D_Last'), ('_RSI1', 'Rsi_14D_1D_Before'), ('_RSI2', 'Rsi_14D_2D_Before')]:
+            rows[dst] = [round(v, 2) for v in rows[src].astype(float)]
+        return rows.set_index('_Row').rename_axis(None).drop(columns=['_RSI', '_RSI1', '_RSI2', '_Last'])
+
+# -------------------- Backend Selection --------------------
+# session alignment is only implemented on pandas; a missing polars falls back to pandas too
+def get_backend(name='pandas', workers=1, align_to_sessions=False):
+    if name == 'polars':
+        if pl is None:
+            print("⚠️ polars is not installed, using the pandas backend")
+        elif align_to_sessions:
+            print("⚠️ Session alignment needs the pandas backend, using it instead of polars")
+        else:
+            return PolarsBackend(workers)
+    return PandasBackend(workers)
+
+# -------------------- Parity Check & Benchmark --------------------
+# runs merge -> rows -> formatted CSV on every backend and compares the CSV text
+def run_backend(backend, history, today):
+    merged = backend.merge_history([history, today])
+    signals = add_ranks(restore_raw(backend.signal_rows(merged), merged).reset_index(drop=True), merged)
+    signals = signals.sort_values(by='Symbol')
+    complete = add_ranks(restore_raw(backend.completedata_rows(merged), merged).reset_index(drop=True), merged)
+    complete = complete.sort_values(by='Symbol')
+    return {
+        'filtered_nepse_signals.csv': format_frame(signals, SIGNALS_SCHEMA).to_csv(),
+        'completedata.csv': format_frame(complete, COMPLETEDATA_SCHEMA).to_csv(),
+    }
+
+def check_parity(history, today, backends=('pandas', 'polars')):
+    outputs = {name: run_backend(get_backend(name), history, today) for name in backends}
+    reference = outputs[backends[0]]
+    mismatches = 0
+    for name in backends[1:]:
+        for file_name, text in outputs[name].items():
+            if text == reference[file_name]:
+                print(f"✅ {name}: '{file_name}' identical to {backends[0]}")
+            else:
+                mismatches += 1
+                diff = [(a, b) for a, b in zip(reference[file_name].splitlines(), text.splitlines()) if a != b]
+                print(f"❌ {name}: '{file_name}' differs from {backends[0]} on {len(diff)} lines, first: {diff[:1]}")
+    return mismatches
+
+def benchmark(history, today, backends=('pandas', 'polars'), repeat=3):
+    timings = []
+    for name in backends:
+        backend = get_backend(name)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run_backend(backend, history, today)
+        timings.append((name, (time.perf_counter() - started) / repeat))
+    report = pd.DataFrame(timings, columns=['Backend', 'Seconds'])
+    report['Speedup'] = (report['Seconds'].iloc[0] / report['Seconds']).round(2)
+    print(report.to_string(index=False))
+    return report
+
+# usage: python backend.py combined_nepse.csv   (the newest date is treated as "today")
+if __name__ == "__main__":
+    data = pd.read_csv(sys.argv[1])
+    last = data['Date'].max()
+    history, today = data[data['Date'] != last], data[data['Date'] == last]
+    print(f"ℹ️ {data['Symbol'].nunique()} symbols, {len(data)} rows")
+    failed = check_parity(history, today)
+    benchmark(history, today)
+    sys.exit(1 if failed else 0)
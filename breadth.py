@@ -0,0 +1,84 @@
+# this code builds the daily market-breadth series (advance/decline, % above MA, RSI spread, volume concentration)
+
+# -------------------- Imports --------------------
+import pandas as pd
+import numpy as np
+from indicators import RSI_PERIOD, panel_indicators
+
+# -------------------- Config --------------------
+BREADTH_FILE = "market_breadth.csv"
+RSI_BINS = [-np.inf, 30, 50, 70, np.inf]
+RSI_LABELS = ['RSI_Below_30', 'RSI_30_50', 'RSI_50_70', 'RSI_70_Plus']
+TOP_N_VOLUME = 10
+# MA_3D counts as above MA_9D only by more than this. Prices have two decimals, so a real gap is
+# at least 0.01 / 9; below that the MAs are equal (flat prices) and only differ by rolling-sum
+# rounding, which depends on where the window started (an incremental update vs a full rebuild)
+MA_TOLERANCE = 1e-6
+BREADTH_COLUMNS = ['Date', 'Symbols', 'Advancers', 'Decliners', 'Unchanged',
+                   'Pct_MA3_Above_MA9'] + RSI_LABELS + ['Total_Volume', 'Top10_Vol_Share']
+
+# -------------------- Daily Aggregates --------------------
+def compute_breadth(panel, dates=None):
+    panel = panel_indicators(panel)
+    if dates is not None:
+        panel = panel[panel['Date'].isin(pd.to_datetime(pd.Series(dates)))]
+    if panel.empty:
+        return pd.DataFrame(columns=BREADTH_COLUMNS)
+
+    panel['Advancers'] = panel['Change'] > 0
+    panel['Decliners'] = panel['Change'] < 0
+    panel['Unchanged'] = panel['Change'] == 0
+    panel['Has_MA'] = panel['MA_9D'].notna()
+    panel['Above'] = (panel['MA_3D'] - panel['MA_9D'] > MA_TOLERANCE) & panel['Has_MA']
+    panel['RSI_Bin'] = pd.cut(panel['RSI'], bins=RSI_BINS, labels=RSI_LABELS, right=False)
+
+    by_date = panel.groupby('Date')
+    breadth = by_date[['Advancers', 'Decliners', 'Unchanged', 'Above', 'Has_MA']].sum().astype(int)
+    breadth['Symbols'] = by_date['Symbol'].count()
+    breadth['Pct_MA3_Above_MA9'] = (100 * breadth['Above'] / breadth['Has_MA'].replace(0, np.nan)).round(2)
+
+    rsi_counts = panel.groupby(['Date', 'RSI_Bin'], observed=False).size().unstack(fill_value=0)
+    breadth = breadth.join(rsi_counts.reindex(columns=RSI_LABELS, fill_value=0))
+
+    # top-N volume share: sort once by date/volume and take the head of each date
+    vol = panel.sort_values(by=['Date', 'Volume'], ascending=[True, False])
+    top = vol.groupby('Date').head(TOP_N_VOLUME).groupby('Date')['Volume'].sum()
+    breadth['Total_Volume'] = by_date['Volume'].sum()
+    breadth['Top10_Vol_Share'] = (top / breadth['Total_Volume'].replace(0, np.nan)).round(4)
+
+    breadth = breadth.reset_index()
+    breadth['Date'] = breadth['Date'].dt.strftime('%Y-%m-%d')
+    return breadth[BREADTH_COLUMNS]
+
+# -------------------- Incremental Update --------------------
+# only dates after the last stored row are computed; older rows are cut to the RSI lookback first.
+# series=None (nothing published yet) builds the series from the whole panel
+def update_breadth(series, panel, remarks=None):
+    dates = pd.to_datetime(panel['Date'], errors='coerce')
+    if series is not None and not series.empty:
+        last_date = pd.to_datetime(series['Date']).max()
+        new_dates = sorted(dates[dates > last_date].dropna().unique())
+    else:
+        series = pd.DataFrame(columns=BREADTH_COLUMNS)
+        new_dates = sorted(dates.dropna().unique())
+
+    if new_dates:
+        # each symbol needs its own last RSI_PERIOD + 1 rows before the first new date
+        before = dates < new_dates[0]
+        lookback = panel[before].assign(_Date=dates[before]).sort_values(by=['Symbol', '_Date'])
+        lookback = lookback.groupby('Symbol').tail(RSI_PERIOD + 1).drop(columns='_Date')
+        window = pd.concat([lookback, panel[dates >= new_dates[0]]], ignore_index=True)
+        added = compute_breadth(window, dates=new_dates)
+        series = pd.concat([series, added], ignore_index=True) if not series.empty else added
+
+    # Remarks only exist for the day the signals were produced, so they are attached to that row
+    if remarks is not None and not series.empty:
+        counts = pd.Series(remarks).value_counts()
+        last = series.index[-1]
+        for label, count in counts.items():
+            series.loc[last, f"Remarks_{label}"] = int(count)
+    return series
+
+def save_breadth(series, file_name=BREADTH_FILE):
+    series.to_csv(file_name, index=False)
+    print(f"✅ Market breadth saved as '{file_name}' ({len(series)} days)")
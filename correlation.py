@@ -0,0 +1,168 @@
+# this code keeps the rolling pairwise return correlation of all symbols and their most correlated peers
+
+# -------------------- Imports --------------------
+import os
+import sys
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+CORR_WINDOW = 60        # trading days in the rolling window
+CORR_MIN_PERIODS = 20   # common days two symbols need before they get a correlation
+TOP_K_PEERS = 5
+CORR_STATE_FILE = "correlation_state.npz"
+PEERS_FILE = "symbol_peers.csv"
+
+# -------------------- Return Panel --------------------
+# dense Date x Symbol matrix of daily close-to-close returns; NaN where a symbol did not trade
+def return_panel(panel):
+    closes = panel.pivot_table(index='Date', columns='Symbol', values='Close', aggfunc='last').sort_index()
+    closes.index = pd.to_datetime(closes.index)
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+# -------------------- Rolling Correlation --------------------
+# keeps the windowed sums over days both symbols traded, as matrix products:
+#   n = M'M, sx = X'M, sxx = (X*X)'M, sxy = X'X   (X returns with NaN -> 0, M traded mask)
+# a new day is one rank-one add (and the day leaving the window one rank-one remove), so the
+# daily update is O(symbols^2) instead of a full O(window * symbols^2) recompute
+class RollingCorrelation:
+    def __init__(self, symbols, window=CORR_WINDOW, min_periods=CORR_MIN_PERIODS):
+        self.symbols = list(symbols)
+        self.window = window
+        self.min_periods = min_periods
+        size = len(self.symbols)
+        self.n, self.sx, self.sxx, self.sxy = (np.zeros((size, size)) for _ in range(4))
+        self.dates = []
+        self.rows = np.zeros((0, size))
+        self.masks = np.zeros((0, size))
+
+    @classmethod
+    def from_returns(cls, returns, window=CORR_WINDOW, min_periods=CORR_MIN_PERIODS):
+        corr = cls(returns.columns, window, min_periods)
+        corr.fit(returns)
+        return corr
+
+    def _dense(self, returns):
+        returns = returns.reindex(columns=self.symbols)
+        mask = returns.notna().to_numpy(dtype=float)
+        return returns.fillna(0.0).to_numpy(dtype=float), mask
+
+    # full recompute over the last `window` days
+    def fit(self, returns):
+        returns = returns.iloc[-self.window:]
+        x, m = self._dense(returns)
+        self.n, self.sx, self.sxx, self.sxy = m.T @ m, x.T @ m, (x * x).T @ m, x.T @ x
+        self.dates = list(returns.index)
+        self.rows, self.masks = x, m
+        return self
+
+    def _add_symbols(self, symbols):
+        new = [s for s in symbols if s not in set(self.symbols)]
+        if not new:
+            return
+        grow = lambda a: np.pad(a, ((0, len(new)), (0, len(new))))
+        self.n, self.sx, self.sxx, self.sxy = grow(self.n), grow(self.sx), grow(self.sxx), grow(self.sxy)
+        self.rows = np.pad(self.rows, ((0, 0), (0, len(new))))
+        self.masks = np.pad(self.masks, ((0, 0), (0, len(new))))
+        self.symbols += new
+
+    # one new trading day of returns (a Series indexed by Symbol)
+    def push(self, date, returns):
+        self._add_symbols(returns.dropna().index)
+        x, m = self._dense(returns.to_frame().T)
+        x, m = x[0], m[0]
+        self.n += np.outer(m, m)
+        self.sx += np.outer(x, m)
+        self.sxx += np.outer(x * x, m)
+        self.sxy += np.outer(x, x)
+        self.dates.append(pd.Timestamp(date))
+        self.rows = np.vstack([self.rows, x])
+        self.masks = np.vstack([self.masks, m])
+
+        if len(self.dates) > self.window:
+            x, m = self.rows[0], self.masks[0]
+            self.n -= np.outer(m, m)
+            self.sx -= np.outer(x, m)
+            self.sxx -= np.outer(x * x, m)
+            self.sxy -= np.outer(x, x)
+            self.dates, self.rows, self.masks = self.dates[1:], self.rows[1:], self.masks[1:]
+
+    # adds the days of `returns` after the last day in the window
+    def update(self, returns):
+        last = self.dates[-1] if self.dates else None
+        new = returns if last is None else returns[returns.index > last]
+        for date, row in new.iterrows():
+            self.push(date, row)
+        return len(new)
+
+    def matrix(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n = np.where(self.n >= self.min_periods, self.n, np.nan)
+            cov = self.sxy - self.sx * self.sx.T / n
+            var_i = self.sxx - self.sx ** 2 / n
+            var_j = var_i.T
+            corr = cov / np.sqrt(var_i * var_j)
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(np.diag(self.n) >= self.min_periods, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
+
+    # -------------------- Top-k Peers --------------------
+    # argpartition picks the k largest per row without sorting the whole row
+    def top_peers(self, symbol=None, k=TOP_K_PEERS):
+        corr = self.matrix().to_numpy().copy()
+        np.fill_diagonal(corr, np.nan)
+        corr = np.where(np.isnan(corr), -np.inf, corr)
+        rows = range(len(self.symbols)) if symbol is None else [self.symbols.index(symbol)]
+        k = min(k, len(self.symbols) - 1)
+        peers = []
+        for i in rows:
+            top = np.argpartition(-corr[i], k - 1)[:k] if k > 0 else []
+            top = sorted(top, key=lambda j: -corr[i, j])
+            for rank, j in enumerate(top, start=1):
+                if np.isfinite(corr[i, j]):
+                    peers.append((self.symbols[i], rank, self.symbols[j], round(float(corr[i, j]), 4)))
+        return pd.DataFrame(peers, columns=['Symbol', 'Rank', 'Peer', 'Correlation'])
+
+    # -------------------- State --------------------
+    def save(self, file_name=CORR_STATE_FILE):
+        np.savez_compressed(file_name, symbols=np.array(self.symbols), window=self.window,
+                            min_periods=self.min_periods, dates=np.array(self.dates, dtype='datetime64[ns]'),
+                            n=self.n, sx=self.sx, sxx=self.sxx, sxy=self.sxy, rows=self.rows, masks=self.masks)
+
+    @classmethod
+    def load(cls, file_name=CORR_STATE_FILE):
+        if not os.path.exists(file_name):
+            return None
+        try:
+            state = np.load(file_name)
+            corr = cls(state['symbols'].tolist(), int(state['window']), int(state['min_periods']))
+            corr.dates = list(pd.to_datetime(state['dates']))
+            corr.n, corr.sx, corr.sxx, corr.sxy = state['n'], state['sx'], state['sxx'], state['sxy']
+            corr.rows, corr.masks = state['rows'], state['masks']
+            return corr
+        except Exception as e:
+            print(f"⚠️ Could not load '{file_name}': {e}")
+            return None
+
+# -------------------- Daily Update --------------------
+# continues the saved window when it ends inside the history, otherwise (first run, gap,
+# re-adjusted prices) rebuilds it from the last CORR_WINDOW days
+def update_correlation(panel, refit=False, file_name=CORR_STATE_FILE):
+    returns = return_panel(panel)
+    corr = None if refit else RollingCorrelation.load(file_name)
+    if corr is not None and corr.dates and corr.dates[-1] in returns.index:
+        added = corr.update(returns)
+        print(f"ℹ️ Correlation window moved by {added} day(s)")
+    else:
+        corr = RollingCorrelation.from_returns(returns)
+        print(f"ℹ️ Correlation window rebuilt over {len(corr.dates)} days")
+    corr.save(file_name)
+    return corr
+
+# usage: python correlation.py combined_nepse.csv [SYMBOL] [k]
+if __name__ == "__main__":
+    history = pd.read_csv(sys.argv[1])
+    symbol = sys.argv[2] if len(sys.argv) > 2 else None
+    k = int(sys.argv[3]) if len(sys.argv) > 3 else TOP_K_PEERS
+    corr = RollingCorrelation.from_returns(return_panel(history))
+    print(corr.top_peers(symbol, k).to_string(index=False))
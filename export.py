@@ -0,0 +1,111 @@
+# this code formats and writes the output CSVs from one column schema per file
+
+# -------------------- Imports --------------------
+import gzip
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# -------------------- Output Schemas --------------------
+# (column, kind, decimals): kind 'date' -> DATE_FORMAT string, 'int' -> NaN as 0, 'float' -> rounded,
+# 'rank' -> whole number with NaN left blank (an unranked symbol must not read as rank 0),
+# 'raw' -> written as it is
+DATE_FORMAT = '%Y-%m-%d'
+SERIAL_LABEL = 'S.N.'
+
+SIGNALS_SCHEMA = [
+    ('Symbol', 'raw', None),
+    ('Date', 'date', None),
+    ('Open', 'raw', None),
+    ('Close', 'raw', None),
+    ('Volume', 'raw', None),
+    ('Avg_Vol_9D', 'int', None),
+    ('MA_3D', 'float', 2),
+    ('MA_9D', 'float', 2),
+    ('RSI_14D_Last', 'float', 1),
+    ('RSI_14D_1DayBefore', 'float', 1),
+    ('RSI_14D_2DaysBefore', 'float', 1),
+    ('Remarks', 'raw', None),
+    ('RSI_Pctl', 'float', 1),
+    ('Mom_5D_Rank', 'rank', None),
+    ('Mom_20D_Rank', 'rank', None),
+    ('Vol_Ratio_Rank', 'rank', None),
+]
+
+COMPLETEDATA_SCHEMA = [
+    ('Symbol', 'raw', None),
+    ('Date', 'date', None),
+    ('Open', 'raw', None),
+    ('Close', 'raw', None),
+    ('Volume', 'raw', None),
+    ('Avg_Vol_9D', 'int', None),
+    ('MA_3D', 'float', 2),
+    ('MA_9D', 'float', 2),
+    ('Rsi_14D_Last', 'raw', None),
+    ('Rsi_14D_1D_Before', 'raw', None),
+    ('Rsi_14D_2D_Before', 'raw', None),
+    ('RSI_Pctl', 'float', 1),
+    ('Mom_5D_Rank', 'rank', None),
+    ('Mom_20D_Rank', 'rank', None),
+    ('Vol_Ratio_Rank', 'rank', None),
+]
+
+def schema_columns(schema):
+    return [name for name, _, _ in schema]
+
+# -------------------- Single-pass Formatting --------------------
+# selects, orders and formats every column at once, numbering rows 1..n as S.N.
+def format_frame(df, schema, serial_label=SERIAL_LABEL):
+    out = {}
+    for name, kind, decimals in schema:
+        values = df[name]
+        if kind == 'date':
+            values = pd.to_datetime(values).dt.strftime(DATE_FORMAT)
+        elif kind == 'int':
+            values = values.fillna(0).astype(int)
+        elif kind == 'rank':
+            values = values.astype('Int64')
+        elif kind == 'float' and decimals is not None:
+            values = values.round(decimals)
+        out[name] = values.values
+    frame = pd.DataFrame(out, columns=schema_columns(schema))
+    if serial_label:
+        frame.index = pd.RangeIndex(1, len(frame) + 1, name=serial_label)
+    return frame
+
+# -------------------- Writers --------------------
+# the CSV text is produced once by pandas' C writer (so bytes match earlier files);
+# compressed copies and Parquet are written from it in parallel threads
+def _write_gzip(data, path):
+    with gzip.open(f"{path}.gz", 'wb') as f:
+        f.write(data)
+    return f"{path}.gz"
+
+def _write_zstd(data, path):
+    import zstandard
+    with open(f"{path}.zst", 'wb') as f:
+        f.write(zstandard.ZstdCompressor().compress(data))
+    return f"{path}.zst"
+
+def _write_parquet(frame, path):
+    parquet_path = path[:-4] + '.parquet' if path.endswith('.csv') else f"{path}.parquet"
+    frame.to_parquet(parquet_path)
+    return parquet_path
+
+def write_outputs(frame, path, extra_outputs=()):
+    data = frame.to_csv(index=frame.index.name is not None).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    writers = {'gzip': lambda: _write_gzip(data, path),
+               'zstd': lambda: _write_zstd(data, path),
+               'parquet': lambda: _write_parquet(frame, path)}
+    written = [path]
+    if extra_outputs:
+        with ThreadPoolExecutor(max_workers=len(extra_outputs)) as pool:
+            jobs = {kind: pool.submit(writers[kind]) for kind in extra_outputs}
+            for kind, job in jobs.items():
+                try:
+                    written.append(job.result())
+                except Exception as e:
+                    print(f"⚠️ Failed to write {kind} copy of '{path}': {e}")
+    return written
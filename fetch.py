@@ -0,0 +1,134 @@
+# this code fetches today's price data from the nepse scraper within a fixed time budget
+
+# -------------------- Imports --------------------
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from decoder import loads_json
+
+# -------------------- Config --------------------
+FETCH_DEADLINE = 90      # seconds for the whole fetch, retries included
+HEDGE_AFTER = 20         # start a second request if the first one is still running after this
+RETRY_BACKOFF = 2        # seconds before the first retry, doubled after every failed round
+SNAPSHOT_FILE = "today_price_snapshot.json"
+MIN_SNAPSHOT_ROWS = 50   # a smaller payload (holiday, partial API failure) never replaces the snapshot
+
+# raised by a scraper for a failure another request cannot fix (e.g. a call missing from a replay
+# cassette); the fetch then stops retrying and goes straight to the snapshot
+class PermanentFetchError(Exception):
+    pass
+
+# -------------------- Payload Validation --------------------
+# get_today_price() has returned both {'content': [...]} and a bare list
+def extract_content(payload):
+    if isinstance(payload, dict):
+        if 'content' not in payload:
+            raise ValueError(f"dict payload without 'content' (keys: {list(payload)[:5]})")
+        content = payload['content']
+    elif isinstance(payload, list):
+        content = payload
+    else:
+        raise ValueError(f"unexpected payload type {type(payload).__name__}")
+    if not isinstance(content, list):
+        raise ValueError(f"'content' is {type(content).__name__}, expected list")
+    if content and not all(isinstance(item, dict) and 'symbol' in item for item in content):
+        raise ValueError("content rows are missing 'symbol'")
+    return content
+
+# -------------------- Snapshot --------------------
+# only a full market payload is kept as the "last good" one
+def save_snapshot(content, file_name=SNAPSHOT_FILE):
+    if len(content) < MIN_SNAPSHOT_ROWS:
+        print(f"ℹ️ {len(content)} rows fetched, last good snapshot kept")
+        return False
+    try:
+        with open(file_name, "w") as f:
+            json.dump({"fetched_at": datetime.now().isoformat(timespec='seconds'), "content": content}, f)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not save snapshot '{file_name}': {e}")
+        return False
+
+def load_snapshot(file_name=SNAPSHOT_FILE):
+    if not os.path.exists(file_name):
+        return None, None
+    try:
+        with open(file_name, "rb") as f:
+            snapshot = loads_json(f.read())
+        content = extract_content(snapshot.get("content"))
+        if len(content) < MIN_SNAPSHOT_ROWS:
+            print(f"⚠️ Snapshot '{file_name}' has only {len(content)} rows, not used")
+            return None, None
+        return content, snapshot.get("fetched_at")
+    except Exception as e:
+        print(f"⚠️ Could not read snapshot '{file_name}': {e}")
+        return None, None
+
+# -------------------- Fetch with Deadline, Hedge and Retry --------------------
+def _attempt(make_scraper, label, results):
+    try:
+        results.put((label, extract_content(make_scraper().get_today_price()), None))
+    except Exception as e:
+        results.put((label, None, e))
+
+# returns (content, source) where source is 'live', 'hedged', 'retry', 'snapshot' or 'none'
+def fetch_today_price(make_scraper, deadline=FETCH_DEADLINE, hedge_after=HEDGE_AFTER,
+                      backoff=RETRY_BACKOFF, snapshot_file=SNAPSHOT_FILE):
+    started = time.monotonic()
+    deadline_at = started + deadline
+    results = queue.Queue()
+    state = {'in_flight': 0, 'attempts': 0}
+
+    # daemon threads: a request that never returns cannot keep the run alive past the deadline
+    def launch(label):
+        state['in_flight'] += 1
+        state['attempts'] += 1
+        threading.Thread(target=_attempt, args=(make_scraper, label, results), daemon=True).start()
+
+    launch('live')
+    hedged = False
+    delay = backoff
+    error = None
+    while True:
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            break
+        wait = min(hedge_after, remaining) if hedge_after and not hedged else remaining
+        try:
+            label, content, error = results.get(timeout=wait)
+        except queue.Empty:
+            if hedge_after and not hedged:
+                hedged = True
+                print(f"⏱️ No response after {hedge_after}s, sending a hedged request")
+                launch('hedged')
+            continue
+
+        state['in_flight'] -= 1
+        if error is None:
+            save_snapshot(content, snapshot_file)
+            print(f"✅ Today's data served by '{label}' request in {time.monotonic() - started:.1f}s "
+                  f"({state['attempts']} request(s), {len(content)} rows)")
+            return content, label
+
+        print(f"⚠️ Failed to fetch today's NEPSE data ({label}): {error}")
+        if isinstance(error, PermanentFetchError):
+            break
+        if state['in_flight'] == 0:
+            pause = min(delay, deadline_at - time.monotonic())
+            if pause <= 0:
+                break
+            time.sleep(pause)
+            delay *= 2
+            hedged = False
+            launch('retry')
+
+    reason = "Fetch cannot succeed" if isinstance(error, PermanentFetchError) else f"Deadline of {deadline}s reached"
+    content, fetched_at = load_snapshot(snapshot_file)
+    if content is not None:
+        print(f"⚠️ {reason}, using last good snapshot from {fetched_at}")
+        return content, 'snapshot'
+    print(f"⚠️ {reason} and no snapshot available")
+    return [], 'none'
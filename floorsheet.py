@@ -0,0 +1,195 @@
+# this code pages through the day's floorsheet and aggregates the trades per symbol and per broker as they arrive
+
+# -------------------- Imports --------------------
+import sys
+import time
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+PAGE_SIZE = 500
+FLOORSHEET_DEADLINE = 600   # seconds for paging through one day
+SYMBOL_FILE = "floorsheet_symbols_{date}.csv"
+BROKER_FILE = "floorsheet_brokers_{date}.csv"
+
+# payload key -> column, as NEPSE names the floorsheet fields
+TRADE_FIELDS = {
+    'contractId': 'Contract',
+    'stockSymbol': 'Symbol',
+    'buyerMemberId': 'Buyer',
+    'sellerMemberId': 'Seller',
+    'contractQuantity': 'Quantity',
+    'contractRate': 'Rate',
+    'contractAmount': 'Amount',
+    'businessDate': 'Date',
+}
+SYMBOL_COLUMNS = ['Symbol', 'Date', 'Volume', 'Amount', 'VWAP', 'Trades', 'High', 'Low']
+BROKER_COLUMNS = ['Symbol', 'Date', 'Broker', 'Buy_Qty', 'Sell_Qty', 'Net_Qty', 'Buy_Amount', 'Sell_Amount',
+                  'Buy_Trades', 'Sell_Trades']
+
+# -------------------- Page Sources --------------------
+# the floorsheet has come back as {'floorsheets': {'content': [...], 'last': ...}}, as
+# {'content': [...]} and as a bare list (then there is only one page)
+def _page_rows(payload):
+    if isinstance(payload, list):
+        return payload, True
+    body = payload.get('floorsheets', payload) if isinstance(payload, dict) else {}
+    rows = body.get('content', []) or []
+    last = body.get('last')
+    if last is None:
+        total = body.get('totalPages')
+        last = total is None or body.get('number', 0) + 1 >= total
+    return rows, bool(last) or not rows
+
+# pages of a scraper that exposes get_floorsheet(page=..., size=...)
+def scraper_pages(scraper, page_size=PAGE_SIZE):
+    page = 0
+    while True:
+        try:
+            payload = scraper.get_floorsheet(page=page, size=page_size)
+        except TypeError:
+            # no paging arguments: the call returns the same rows every time, so it is read once
+            yield _page_rows(scraper.get_floorsheet())[0]
+            return
+        rows, last = _page_rows(payload)
+        yield rows
+        if last:
+            return
+        page += 1
+
+# local stand-in with the same paging as the live endpoint, over a trades CSV/DataFrame
+class LocalFloorsheet:
+    def __init__(self, trades, page_size=PAGE_SIZE):
+        self.trades = pd.read_csv(trades) if isinstance(trades, str) else trades
+        self.page_size = page_size
+
+    def get_floorsheet(self, page=0, size=None):
+        size = size or self.page_size
+        chunk = self.trades.iloc[page * size:(page + 1) * size]
+        inverse = {column: key for key, column in TRADE_FIELDS.items()}
+        total = -(-len(self.trades) // size)
+        return {'floorsheets': {'content': chunk.rename(columns=inverse).to_dict(orient='records'),
+                                'number': page, 'totalPages': total, 'last': page + 1 >= total}}
+
+# -------------------- Streaming Aggregation --------------------
+# only the running per-symbol / per-broker sums and the sorted int64 ids of the contracts read so
+# far are kept (8 bytes a trade); each page is dropped once folded in. Pages that shift during the
+# day can repeat trades, and nothing guarantees their order, so repeats are found by exact id
+class FloorsheetAggregator:
+    def __init__(self):
+        self.symbols = None
+        self.brokers = None
+        self.seen = np.zeros(0, dtype=np.int64)
+        self.rows = 0
+        self.duplicates = 0
+
+    def add_page(self, rows):
+        if not rows:
+            return
+        page = pd.DataFrame({column: [row.get(key) for row in rows] for key, column in TRADE_FIELDS.items()})
+        ids = pd.to_numeric(page['Contract'], errors='coerce')
+        known = ids.notna().values
+        ids = ids.fillna(-1).to_numpy(dtype=np.int64)
+        at = np.minimum(np.searchsorted(self.seen, ids), max(len(self.seen) - 1, 0))
+        seen = known & (self.seen[at] == ids) if len(self.seen) else np.zeros(len(ids), dtype=bool)
+        fresh = ~seen & ~page['Contract'].duplicated().values
+        self.duplicates += int((~fresh).sum())
+        self.seen = np.union1d(self.seen, ids[known & fresh])
+        page = page[fresh]
+        self.rows += len(page)
+        if page.empty:
+            return
+        for col in ['Quantity', 'Rate', 'Amount']:
+            page[col] = pd.to_numeric(page[col], errors='coerce')
+
+        symbols = page.groupby(['Symbol', 'Date']).agg(
+            Volume=('Quantity', 'sum'), Amount=('Amount', 'sum'), Trades=('Contract', 'size'),
+            High=('Rate', 'max'), Low=('Rate', 'min'))
+        if self.symbols is None:
+            self.symbols = symbols
+        else:
+            both = self.symbols.index.union(symbols.index)
+            old, new = self.symbols.reindex(both), symbols.reindex(both)
+            sums = old[['Volume', 'Amount', 'Trades']].add(new[['Volume', 'Amount', 'Trades']], fill_value=0)
+            sums['High'] = np.fmax(old['High'], new['High'])
+            sums['Low'] = np.fmin(old['Low'], new['Low'])
+            self.symbols = sums
+
+        buys = page.assign(Broker=page['Buyer'], Buy_Qty=page['Quantity'], Buy_Amount=page['Amount'], Buy_Trades=1)
+        sells = page.assign(Broker=page['Seller'], Sell_Qty=page['Quantity'], Sell_Amount=page['Amount'], Sell_Trades=1)
+        sides = pd.concat([buys, sells], ignore_index=True)
+        value_cols = ['Buy_Qty', 'Sell_Qty', 'Buy_Amount', 'Sell_Amount', 'Buy_Trades', 'Sell_Trades']
+        brokers = sides.groupby(['Symbol', 'Date', 'Broker'])[value_cols].sum(min_count=0)
+        self.brokers = brokers if self.brokers is None else self.brokers.add(brokers, fill_value=0)
+
+    def consume(self, pages, deadline=FLOORSHEET_DEADLINE):
+        started = time.monotonic()
+        complete = True
+        for count, rows in enumerate(pages, start=1):
+            self.add_page(rows)
+            if time.monotonic() - started > deadline:
+                print(f"⚠️ Floorsheet deadline of {deadline}s reached after {count} pages, aggregates are partial")
+                complete = False
+                break
+        print(f"ℹ️ Floorsheet: {self.rows} trades aggregated, {self.duplicates} repeated trades skipped")
+        return complete
+
+    def symbol_table(self):
+        if self.symbols is None:
+            return pd.DataFrame(columns=SYMBOL_COLUMNS)
+        table = self.symbols.reset_index()
+        table['VWAP'] = (table['Amount'] / table['Volume'].replace(0, np.nan)).round(2)
+        table['Trades'] = table['Trades'].astype(int)
+        return table[SYMBOL_COLUMNS].sort_values(by='Symbol').reset_index(drop=True)
+
+    def broker_table(self):
+        if self.brokers is None:
+            return pd.DataFrame(columns=BROKER_COLUMNS)
+        table = self.brokers.fillna(0).reset_index()
+        table['Net_Qty'] = table['Buy_Qty'] - table['Sell_Qty']
+        for col in ['Buy_Trades', 'Sell_Trades']:
+            table[col] = table[col].astype(int)
+        return table[BROKER_COLUMNS].sort_values(by=['Symbol', 'Broker']).reset_index(drop=True)
+
+# -------------------- Save --------------------
+# dated files next to the daily price history; returns the written file names
+def save_aggregates(aggregator, date):
+    files = []
+    for template, table in [(SYMBOL_FILE, aggregator.symbol_table()), (BROKER_FILE, aggregator.broker_table())]:
+        if table.empty:
+            continue
+        file_name = template.format(date=date)
+        table.to_csv(file_name, index=False)
+        print(f"✅ {len(table)} rows saved as '{file_name}'")
+        files.append(file_name)
+    return files
+
+# usage: python floorsheet.py trades.csv [page_size]   (pages through the local stand-in in
+# contract order, in symbol order and with every page served twice, and checks the streamed
+# aggregates against one groupby over the whole file)
+if __name__ == "__main__":
+    trades = pd.read_csv(sys.argv[1])
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else PAGE_SIZE
+    full = trades.drop_duplicates(subset='Contract').groupby(['Symbol', 'Date']).agg(
+        Volume=('Quantity', 'sum'), Amount=('Amount', 'sum')).reset_index().sort_values(by='Symbol')
+
+    orders = {
+        'contract order': trades.sort_values(by='Contract', kind='stable'),
+        'symbol order': trades.sort_values(by='Symbol', kind='stable'),
+    }
+    source = LocalFloorsheet(orders['symbol order'], page_size)
+    orders['repeated pages'] = (rows for page in range(-(-len(trades) // page_size))
+                                for rows in [source.get_floorsheet(page=page)['floorsheets']['content']] * 2)
+    failed = False
+    for name, pages in orders.items():
+        if isinstance(pages, pd.DataFrame):
+            pages = scraper_pages(LocalFloorsheet(pages.reset_index(drop=True), page_size), page_size)
+        aggregator = FloorsheetAggregator()
+        aggregator.consume(pages)
+        streamed = aggregator.symbol_table()
+        same = (len(streamed) == len(full) and
+                np.allclose(streamed[['Volume', 'Amount']].to_numpy(float), full[['Volume', 'Amount']].to_numpy(float)))
+        failed |= not same
+        print(("✅" if same else "❌") + f" {name}: streamed per-symbol totals {'match' if same else 'differ from'} the full groupby")
+    print(streamed.head(10).to_string(index=False))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,101 @@
+# this code holds the GitHub read/upload helpers shared by the scripts that publish into daily_data
+
+# -------------------- Imports --------------------
+import io
+import os
+import base64
+import hashlib
+import requests
+import pandas as pd
+
+# -------------------- GitHub Config --------------------
+REPO = "ChintanKoirala/NepseAnalysis"
+BRANCH = "main"
+UPLOAD_FOLDER = "daily_data"
+RAW_BASE = f"https://raw.githubusercontent.com/{REPO}/{BRANCH}/{UPLOAD_FOLDER}"
+API_BASE = f"https://api.github.com/repos/{REPO}"
+# on every commit the scripts make, so their own uploads do not start the push-triggered workflows
+SKIP_CI = "[skip ci]"
+
+def get_headers():
+    token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_PAT")
+    if not token:
+        return None
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github.v3+json"
+    }
+
+# -------------------- Read a published CSV --------------------
+# None only when the file is not published yet (HTTP 404); any other failure (timeout, 5xx,
+# rate limit, unreadable CSV) raises, so a caller never mistakes it for a first run and
+# publishes a rebuilt file over the real series
+def read_published_csv(file_name):
+    response = requests.get(f"{RAW_BASE}/{file_name}", timeout=60)
+    if response.status_code == 404:
+        print(f"ℹ️ '{file_name}' is not published yet")
+        return None
+    response.raise_for_status()
+    return pd.read_csv(io.BytesIO(response.content))
+
+# -------------------- Git Data API --------------------
+# sha git gives a file's content (what the contents API reports as "sha")
+def git_blob_sha(data):
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+# exact bytes of a blob by sha (no raw.githubusercontent cache in between)
+def fetch_blob(sha):
+    response = requests.get(f"{API_BASE}/git/blobs/{sha}", headers=get_headers() or {}, timeout=60)
+    response.raise_for_status()
+    return base64.b64decode(response.json()['content'])
+
+# several files added/replaced/deleted in ONE commit. build() returns {repo path: bytes, or None
+# to delete} and is called again when the branch moved underneath (the ref update is not forced)
+def commit_files(build, message, retries=3):
+    headers = get_headers()
+    if headers is None:
+        print("❌ GitHub token not found. Set GITHUB_TOKEN (Actions) or GH_PAT (local).")
+        return False
+
+    for attempt in range(retries):
+        try:
+            head = requests.get(f"{API_BASE}/git/ref/heads/{BRANCH}", headers=headers, timeout=30)
+            head.raise_for_status()
+            parent = head.json()['object']['sha']
+            commit = requests.get(f"{API_BASE}/git/commits/{parent}", headers=headers, timeout=30)
+            commit.raise_for_status()
+
+            changes = build()
+            if not changes:
+                return True
+            tree = []
+            for path, data in sorted(changes.items()):
+                if data is None:
+                    tree.append({"path": path, "mode": "100644", "type": "blob", "sha": None})
+                    continue
+                blob = requests.post(f"{API_BASE}/git/blobs", headers=headers, timeout=60,
+                                     json={"content": base64.b64encode(data).decode(), "encoding": "base64"})
+                blob.raise_for_status()
+                tree.append({"path": path, "mode": "100644", "type": "blob", "sha": blob.json()['sha']})
+
+            new_tree = requests.post(f"{API_BASE}/git/trees", headers=headers, timeout=60,
+                                     json={"base_tree": commit.json()['tree']['sha'], "tree": tree})
+            new_tree.raise_for_status()
+            new_commit = requests.post(f"{API_BASE}/git/commits", headers=headers, timeout=30,
+                                       json={"message": f"{message} {SKIP_CI}", "tree": new_tree.json()['sha'], "parents": [parent]})
+            new_commit.raise_for_status()
+            ref = requests.patch(f"{API_BASE}/git/refs/heads/{BRANCH}", headers=headers, timeout=30,
+                                 json={"sha": new_commit.json()['sha'], "force": False})
+            if ref.status_code == 200:
+                print(f"✅ Committed {len(changes)} file changes: {message}")
+                return True
+            if ref.status_code != 422:
+                print(f"❌ Failed to move '{BRANCH}'. Status code: {ref.status_code}")
+                print(ref.text)
+                return False
+            print(f"ℹ️ '{BRANCH}' moved underneath (attempt {attempt + 1}), retrying")
+        except Exception as e:
+            print(f"❌ Exception during commit: {e}")
+            return False
+    print(f"❌ Nothing committed after {retries} attempts")
+    return False
@@ -0,0 +1,255 @@
+# this code scans a multi-year price history in chunks, skipping chunks that cannot match the date/symbol filter
+
+# -------------------- Imports --------------------
+import io
+import os
+import sys
+import json
+import requests
+import pandas as pd
+from indicators import RSI_PERIOD, panel_indicators
+
+# -------------------- Config --------------------
+COLUMNS = ['Symbol', 'Date', 'Open', 'Close', 'Volume']
+CHUNK_ROWS = 50_000
+INDEX_SUFFIX = '.idx.json'
+LOOKBACK_DAYS = 365  # a remote scan with a lookback reads at most this many calendar days before `start`
+
+# -------------------- Chunk Index (local CSV) --------------------
+# byte range, row count, date range and symbols of every CHUNK_ROWS-line block; built once per file
+# version and kept next to it, so a scan can seek straight to the blocks that can match
+def build_chunk_index(path, chunk_rows=CHUNK_ROWS):
+    chunks = []
+    with open(path, 'rb') as f:
+        header = f.readline()
+        names = header.decode().strip().split(',')
+        date_pos, symbol_pos = names.index('Date'), names.index('Symbol')
+        start, rows, dates, symbols = f.tell(), 0, [], set()
+        while True:
+            line = f.readline()
+            if line:
+                fields = line.decode().rstrip('\r\n').split(',')
+                dates.append(fields[date_pos])
+                symbols.add(fields[symbol_pos])
+                rows += 1
+            if rows and (rows == chunk_rows or not line):
+                end = f.tell()
+                chunks.append({'start': start, 'end': end, 'rows': rows,
+                               'min_date': min(dates), 'max_date': max(dates), 'symbols': sorted(symbols)})
+                start, rows, dates, symbols = end, 0, [], set()
+            if not line:
+                break
+    stat = os.stat(path)
+    index = {'size': stat.st_size, 'mtime': stat.st_mtime, 'header': header.decode(), 'chunks': chunks}
+    with open(path + INDEX_SUFFIX, 'w') as f:
+        json.dump(index, f)
+    return index
+
+def load_chunk_index(path, chunk_rows=CHUNK_ROWS):
+    try:
+        with open(path + INDEX_SUFFIX) as f:
+            index = json.load(f)
+        stat = os.stat(path)
+        if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    return build_chunk_index(path, chunk_rows)
+
+def _wanted(chunk, start, end, symbols):
+    if start is not None and chunk['max_date'] < start:
+        return False
+    if end is not None and chunk['min_date'] > end:
+        return False
+    if symbols is not None and symbols.isdisjoint(chunk['symbols']):
+        return False
+    return True
+
+# -------------------- Row Filter --------------------
+def _filter(df, start, end, symbols):
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    mask = df['Date'].notna()
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= pd.Timestamp(end)
+    if symbols is not None:
+        mask &= df['Symbol'].isin(symbols)
+    return df[mask]
+
+# -------------------- Scan --------------------
+# yields filtered chunks; start/end are 'YYYY-MM-DD' strings, symbols an iterable.
+# order='asc' yields oldest first (needed by stream_indicators on a newest-first file): local
+# chunks are visited by date; a newest-first remote file cannot be read backwards, so its
+# filtered chunks are held back and yielded in reverse, which needs a `start` to bound them.
+# lookback > 0 also keeps each symbol's last `lookback` rows before `start`
+def scan_history(source, start=None, end=None, symbols=None, columns=COLUMNS,
+                 chunk_rows=CHUNK_ROWS, order=None, newest_first=False, lookback=0):
+    symbols = set(symbols) if symbols is not None else None
+    if str(source).endswith('.parquet'):
+        yield from _scan_parquet(source, start, end, symbols, columns)
+    elif str(source).startswith('http'):
+        if order == 'asc' and newest_first and start is None:
+            raise ValueError("a newest-first remote file is only read oldest first from a `start` date")
+        chunks = _scan_url(source, start, end, symbols, columns, chunk_rows, newest_first, lookback)
+        if order == 'asc' and newest_first:
+            for df in reversed(list(chunks)):
+                yield df.iloc[::-1].reset_index(drop=True)
+        else:
+            yield from chunks
+    else:
+        yield from _scan_csv(source, start, end, symbols, columns, chunk_rows, order, lookback)
+
+# chunks wholly before `start` that hold the last `lookback` rows of the symbols in `chunks`,
+# newest first. A symbol stops being looked for once it has them, or once no older chunk lists
+# it (a new listing), so the walk ends without reading back to the start of the file
+def _lookback_chunks(f, header, index, chunks, start, end, symbols, lookback):
+    needed = set().union(*[c['symbols'] for c in chunks])
+    if symbols is not None:
+        needed &= symbols
+    earlier = sorted((c for c in index['chunks'] if c['max_date'] < start and _wanted(c, None, end, symbols)),
+                     key=lambda c: c['max_date'], reverse=True)
+    counts, picked = {}, []
+    for i, chunk in enumerate(earlier):
+        needed &= set().union(*[c['symbols'] for c in earlier[i:]])
+        if not needed:
+            break
+        if needed.isdisjoint(chunk['symbols']):
+            continue
+        f.seek(chunk['start'])
+        block = pd.read_csv(io.BytesIO(header + f.read(chunk['end'] - chunk['start'])), usecols=['Symbol'])
+        for symbol, count in block['Symbol'][block['Symbol'].isin(needed)].value_counts().items():
+            counts[symbol] = counts.get(symbol, 0) + count
+            if counts[symbol] >= lookback:
+                needed.discard(symbol)
+        picked.append(chunk)
+    return picked
+
+def _scan_csv(path, start, end, symbols, columns, chunk_rows, order, lookback=0):
+    index = load_chunk_index(path, chunk_rows)
+    chunks = [c for c in index['chunks'] if _wanted(c, start, end, symbols)]
+    header = index['header'].encode()
+    if lookback and start is not None:
+        with open(path, 'rb') as f:
+            chunks += _lookback_chunks(f, header, index, chunks, start, end, symbols, lookback)
+        # rows before `start` are kept for the lookback; the caller drops them
+        start = None
+    if order == 'asc':
+        chunks.sort(key=lambda c: (c['min_date'], c['max_date']))
+    skipped = len(index['chunks']) - len(chunks)
+    if skipped:
+        print(f"ℹ️ Skipping {skipped} of {len(index['chunks'])} chunks of '{path}' outside the filter")
+    with open(path, 'rb') as f:
+        for chunk in chunks:
+            f.seek(chunk['start'])
+            block = f.read(chunk['end'] - chunk['start'])
+            df = pd.read_csv(io.BytesIO(header + block), usecols=lambda c: c in columns)
+            df = _filter(df, start, end, symbols)
+            if not df.empty:
+                yield df
+
+# a remote file cannot be seeked into; it is streamed in line blocks instead, and a
+# newest-first file (as combined_nepse_*.csv is written) stops downloading once past `start`
+# and, with a lookback, once every symbol seen since `start` has that many rows before it (a new
+# listing never does, so LOOKBACK_DAYS bounds the read)
+def _scan_url(url, start, end, symbols, columns, chunk_rows, newest_first, lookback=0):
+    keep_older = newest_first and start is not None and lookback > 0
+    recent, older = set(), {}
+    with requests.get(url, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        lines = resp.iter_lines()
+        header = next(lines)
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) < chunk_rows:
+                continue
+            df = pd.read_csv(io.BytesIO(b'\n'.join([header] + block)), usecols=lambda c: c in columns)
+            block = []
+            oldest = pd.to_datetime(df['Date'], errors='coerce').min()
+            df = _filter(df, None if keep_older else start, end, symbols)
+            if keep_older:
+                before = df['Date'] < pd.Timestamp(start)
+                recent.update(df.loc[~before, 'Symbol'])
+                for symbol, count in df.loc[before, 'Symbol'].value_counts().items():
+                    older[symbol] = older.get(symbol, 0) + count
+            if not df.empty:
+                yield df
+            if newest_first and start is not None and oldest < pd.Timestamp(start):
+                if (not keep_older or all(older.get(s, 0) >= lookback for s in recent)
+                        or oldest < pd.Timestamp(start) - pd.Timedelta(days=LOOKBACK_DAYS)):
+                    return
+        if block:
+            df = _filter(pd.read_csv(io.BytesIO(b'\n'.join([header] + block)), usecols=lambda c: c in columns),
+                         None if keep_older else start, end, symbols)
+            if not df.empty:
+                yield df
+
+# row groups whose min/max statistics miss the filter are not decoded
+def _scan_parquet(path, start, end, symbols, columns):
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format='parquet')
+    # compare in the stored type: 'YYYY-MM-DD' strings, or date/timestamp values
+    date_type = str(dataset.schema.field('Date').type)
+    as_stored = lambda d: d if date_type in ('string', 'large_string') else (
+        pd.Timestamp(d).date() if date_type.startswith('date') else pd.Timestamp(d).to_pydatetime())
+    expr = None
+    for cond in [
+        (ds.field('Date') >= as_stored(start)) if start is not None else None,
+        (ds.field('Date') <= as_stored(end)) if end is not None else None,
+        ds.field('Symbol').isin(sorted(symbols)) if symbols is not None else None,
+    ]:
+        if cond is not None:
+            expr = cond if expr is None else expr & cond
+    names = [c for c in columns if c in dataset.schema.names]
+    for batch in dataset.to_batches(columns=names, filter=expr):
+        if batch.num_rows:
+            df = batch.to_pandas()
+            df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+            yield df
+
+# -------------------- Streaming Indicators --------------------
+# runs a rolling, per-symbol indicator function over date-ordered chunks. The last `lookback`
+# rows of every symbol are carried into the next chunk, so windows that straddle a chunk
+# boundary come out the same as on the full history, and memory stays at chunk + carry.
+def stream_indicators(chunks, func=panel_indicators, lookback=RSI_PERIOD + 1):
+    carry = None
+    last_date = None
+    for chunk in chunks:
+        if last_date is not None and chunk['Date'].min() < last_date:
+            raise ValueError("chunks must arrive oldest first (scan with order='asc')")
+        last_date = chunk['Date'].max()
+
+        fresh = chunk.assign(_Fresh=True)
+        frame = fresh if carry is None else pd.concat([carry.assign(_Fresh=False), fresh], ignore_index=True)
+        frame = frame.sort_values(by=['Symbol', 'Date'], kind='stable').reset_index(drop=True)
+
+        out = func(frame.drop(columns='_Fresh'))
+        # func sorts by Symbol/Date as well, so the fresh flags line up row for row
+        yield out[frame['_Fresh'].values].reset_index(drop=True)
+
+        carry = frame.drop(columns='_Fresh').groupby('Symbol').tail(lookback)
+
+# usage: python history_scan.py <history.csv | url> output.csv [start] [end] [SYMBOL,SYMBOL...]  ('' skips a filter)
+# a url is read as a newest-first file, the way combined_nepse_*.csv is published
+if __name__ == "__main__":
+    source, output = sys.argv[1], sys.argv[2]
+    start, end, symbols = ([arg or None for arg in sys.argv[3:6]] + [None] * 3)[:3]
+    symbols = symbols.split(',') if symbols else None
+
+    # indicators need the lookback before `start`: the scan also keeps each symbol's last rows
+    # before it, and those rows are dropped after the indicators are computed
+    remote = source.startswith('http')
+    if remote and start is None:
+        print("❌ A url is read newest first; give a start date to bound what is held in memory")
+        sys.exit(1)
+    rows_written = 0
+    chunks = scan_history(source, start=start, end=end, symbols=symbols, order='asc',
+                          newest_first=remote, lookback=RSI_PERIOD + 1)
+    for out in stream_indicators(chunks):
+        if start is not None:
+            out = out[out['Date'] >= pd.Timestamp(start)]
+        out.to_csv(output, mode='a' if rows_written else 'w', header=not rows_written, index=False)
+        rows_written += len(out)
+    print(f"✅ {rows_written} rows with indicators written to '{output}'")
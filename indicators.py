@@ -0,0 +1,98 @@
+# this code holds the indicator calculations shared by the daily scripts and the weekly/monthly bars
+
+# -------------------- Imports --------------------
+import pandas as pd
+import numpy as np
+
+RSI_PERIOD = 14
+
+# -------------------- Standard RSI Calculation --------------------
+def calculate_rsi_standard(prices, period=14):
+    prices = pd.Series(prices).astype(float).reset_index(drop=True)
+    rsi = pd.Series([np.nan] * len(prices))
+    if len(prices) < period + 1:
+        return rsi
+    for i in range(period, len(prices)):
+        window = prices[i - period:i + 1]
+        deltas = window.diff().dropna()
+        gains = deltas[deltas > 0].sum()
+        losses = -deltas[deltas < 0].sum()
+        avg_gain = gains / period
+        avg_loss = losses / period
+        if avg_loss == 0:
+            rsi_val = 100.0
+        elif avg_gain == 0:
+            rsi_val = 0.0
+        else:
+            rs = avg_gain / avg_loss
+            rsi_val = 100 - (100 / (1 + rs))
+        rsi.iloc[i] = round(rsi_val, 1)
+    return rsi
+
+# -------------------- Last N RSI Values (simple average) --------------------
+# RSI for the last bar and the `count - 1` bars before it, as used in completedata.csv
+def rsi_last_values(closes, period=14, count=3):
+    closes = pd.to_numeric(pd.Series(closes), errors='coerce').dropna()
+    delta = closes.diff()
+    gains = delta.clip(lower=0)
+    losses = -delta.clip(upper=0)
+
+    rsi_values = []
+    for offset in range(count):
+        if len(closes) < period + 1 + offset:
+            rsi_values.append(None)
+            continue
+
+        gp = gains.iloc[-(period + offset):-offset if offset != 0 else None]
+        lp = losses.iloc[-(period + offset):-offset if offset != 0 else None]
+
+        avg_gain = gp.mean()
+        avg_loss = lp.mean()
+
+        if avg_loss == 0 and avg_gain == 0:
+            rsi = 50.0
+        elif avg_loss == 0:
+            rsi = 100.0
+        else:
+            rs = avg_gain / avg_loss
+            rsi = 100 - (100 / (1 + rs))
+
+        rsi_values.append(round(rsi, 2))
+    return rsi_values
+
+# -------------------- Moving Averages & Volume Ratio --------------------
+# unit is the bar suffix: 'D' gives MA_9D on daily rows, 'W' gives MA_9W on weekly bars
+def add_moving_averages(group, unit='D'):
+    group[f'Avg_Vol_9{unit}'] = group['Volume'].rolling(9).mean()
+    group[f'MA_3{unit}'] = group['Close'].rolling(3).mean()
+    group[f'MA_9{unit}'] = group['Close'].rolling(9).mean()
+    group['Vol_Ratio'] = group['Volume'] / group[f'Avg_Vol_9{unit}']
+    return group
+
+def add_rsi(group, period=RSI_PERIOD, unit='D'):
+    group[f'RSI_{period}{unit}'] = calculate_rsi_standard(group['Close'].values, period=period).values
+    return group
+
+# -------------------- Whole-panel Indicators (one vectorized pass) --------------------
+# Change, MA_3D, MA_9D and RSI for every Symbol/Date row
+def panel_indicators(panel):
+    panel = panel[['Symbol', 'Date', 'Close', 'Volume']].copy()
+    panel['Date'] = pd.to_datetime(panel['Date'], errors='coerce')
+    panel['Close'] = pd.to_numeric(panel['Close'], errors='coerce')
+    panel['Volume'] = pd.to_numeric(panel['Volume'], errors='coerce')
+    panel = panel.dropna(subset=['Date']).sort_values(by=['Symbol', 'Date']).reset_index(drop=True)
+
+    by_symbol = panel.groupby('Symbol', sort=False)
+    delta = by_symbol['Close'].diff()
+    panel['Change'] = delta
+    panel['MA_3D'] = by_symbol['Close'].rolling(3).mean().reset_index(level=0, drop=True)
+    panel['MA_9D'] = by_symbol['Close'].rolling(9).mean().reset_index(level=0, drop=True)
+
+    # same simple-average RSI as calculate_rsi_standard, without the per-row loop
+    gains = delta.clip(lower=0).groupby(panel['Symbol'], sort=False).rolling(RSI_PERIOD).sum().reset_index(level=0, drop=True)
+    losses = (-delta.clip(upper=0)).groupby(panel['Symbol'], sort=False).rolling(RSI_PERIOD).sum().reset_index(level=0, drop=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + gains / losses)
+    rsi = rsi.where(losses != 0, 100.0).where(gains.notna())
+    panel['RSI'] = rsi.round(1)
+    return panel
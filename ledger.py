@@ -0,0 +1,95 @@
+# this code keeps a run ledger so repeated runs on the same NEPSE payload skip work that is already done
+
+# -------------------- Imports --------------------
+import os
+import json
+import hashlib
+from datetime import datetime
+
+# -------------------- Config --------------------
+# kept in the repo (committed with the run's outputs), so every checkout starts from the last published state
+LEDGER_FILE = "daily_data/ledger/run_ledger_{name}.json"
+HISTORY_LENGTH = 60
+
+# -------------------- Hashing --------------------
+def content_hash(content):
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def business_date_of(content):
+    dates = {item.get('businessDate') for item in content if item.get('businessDate')}
+    return max(dates) if dates else None
+
+# -------------------- Run Ledger --------------------
+# stages: name -> {"input": hash, "output": hash, "business_date": ..., "at": ...}
+class RunLedger:
+    def __init__(self, name, business_date=None):
+        self.path = LEDGER_FILE.format(name=name)
+        self.business_date = business_date
+        self.skipped = []
+        self.previous = {}
+        self.data = {"stages": {}, "history": []}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Could not read run ledger '{self.path}', starting a new one: {e}")
+
+    def unchanged(self, stage, input_hash):
+        entry = self.data["stages"].get(stage)
+        return bool(entry) and entry.get("input") == input_hash and entry.get("output") is not None
+
+    def output_of(self, stage):
+        return self.data["stages"].get(stage, {}).get("output")
+
+    def record(self, stage, input_hash, output_hash):
+        self.previous.setdefault(stage, self.data["stages"].get(stage))
+        self.data["stages"][stage] = {
+            "input": input_hash,
+            "output": output_hash,
+            "business_date": self.business_date,
+            "at": datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+
+    # puts back what the stage held before this run (the commit it was recorded for failed)
+    def revert(self, stage):
+        if stage in self.previous:
+            previous = self.previous.pop(stage)
+            if previous is None:
+                self.data["stages"].pop(stage, None)
+            else:
+                self.data["stages"][stage] = previous
+            self.save()
+
+    def skip(self, stage, reason):
+        self.skipped.append((stage, reason))
+        print(f"⏭️ Skipping {stage}: {reason}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.data, f, indent=1)
+        except Exception as e:
+            print(f"⚠️ Could not save run ledger '{self.path}': {e}")
+
+    # appends this run to the history and prints what was skipped
+    def report(self):
+        self.data["history"] = (self.data.get("history", []) + [{
+            "at": datetime.now().isoformat(timespec='seconds'),
+            "business_date": self.business_date,
+            "skipped": [stage for stage, _ in self.skipped],
+        }])[-HISTORY_LENGTH:]
+        self.save()
+        if self.skipped:
+            print(f"📒 Run ledger: skipped {', '.join(stage for stage, _ in self.skipped)} for {self.business_date}")
+        else:
+            print(f"📒 Run ledger: all stages ran for {self.business_date}")
@@ -0,0 +1,140 @@
+# this code keeps daily_data/manifest.json, the index of every dated file published into daily_data
+
+# -------------------- Imports --------------------
+import os
+import re
+import json
+import base64
+import requests
+from github_utils import REPO, BRANCH, UPLOAD_FOLDER, RAW_BASE, get_headers, fetch_blob, git_blob_sha, commit_files
+from ledger import file_hash
+
+# -------------------- Config --------------------
+# {"artifacts": {type: {date: {"file", "sha", "size"}}}, "latest": {type: date}}
+# plus "archives" for the monthly archives written by archive.py
+MANIFEST_FILE = "manifest.json"
+MANIFEST_URL = f"https://api.github.com/repos/{REPO}/contents/{UPLOAD_FOLDER}/{MANIFEST_FILE}"
+TREE_URL = f"https://api.github.com/repos/{REPO}/git/trees/{BRANCH}"
+DATED_NAME = re.compile(r"^(?P<kind>.+)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$")
+
+def split_name(name):
+    match = DATED_NAME.match(os.path.basename(name))
+    return (match.group('kind'), match.group('date')) if match else (None, None)
+
+# -------------------- Entries --------------------
+def add_entry(manifest, name, sha, size):
+    kind, date = split_name(name)
+    if kind is None:
+        return False
+    manifest['artifacts'].setdefault(kind, {})[date] = {'file': os.path.basename(name), 'sha': sha, 'size': size}
+    if date > manifest['latest'].get(kind, ''):
+        manifest['latest'][kind] = date
+    return True
+
+def remove_entry(manifest, name):
+    kind, date = split_name(name)
+    entries = manifest['artifacts'].get(kind, {})
+    entries.pop(date, None)
+    if manifest['latest'].get(kind) == date:
+        if entries:
+            manifest['latest'][kind] = max(entries)
+        else:
+            manifest['latest'].pop(kind, None)
+            manifest['artifacts'].pop(kind, None)
+
+def latest_entry(manifest, kind):
+    date = manifest['latest'].get(kind)
+    return (date, manifest['artifacts'][kind][date]) if date else (None, None)
+
+def entries_for_date(manifest, date):
+    return {kind: entries[date] for kind, entries in manifest['artifacts'].items() if date in entries}
+
+# (date, file, sha) of every dated file, across all types
+def dated_entries(manifest):
+    return [(date, entry['file'], entry['sha'])
+            for entries in manifest['artifacts'].values() for date, entry in entries.items()]
+
+# -------------------- Read --------------------
+# one-off bootstrap: the git tree lists the whole folder in a single call, without the
+# 1,000-entry cap of the contents API
+def rebuild_manifest():
+    manifest = {'artifacts': {}, 'latest': {}}
+    resp = requests.get(TREE_URL, headers=get_headers() or {}, params={'recursive': 1}, timeout=30)
+    resp.raise_for_status()
+    archives = []
+    for item in resp.json().get('tree', []):
+        if item.get('type') == 'blob' and os.path.dirname(item['path']) == UPLOAD_FOLDER:
+            add_entry(manifest, item['path'], item.get('sha'), item.get('size'))
+        elif item.get('type') == 'blob' and os.path.dirname(item['path']) == f"{UPLOAD_FOLDER}/archive":
+            archives.append(item)
+    # monthly archives describe themselves (see archive.py), so their day index is read back from them
+    if archives:
+        from archive import add_archive, index_archive
+        for item in archives:
+            add_archive(manifest, os.path.basename(item['path']), item.get('sha'), item.get('size'),
+                        index_archive(fetch_blob(item['sha'])))
+    print(f"ℹ️ Manifest rebuilt from the repo tree ({len(dated_entries(manifest))} dated files)")
+    return manifest
+
+# returns (manifest, sha of manifest.json); sha is None when the manifest does not exist yet
+def fetch_manifest():
+    resp = requests.get(MANIFEST_URL, headers=get_headers() or {}, params={'ref': BRANCH}, timeout=30)
+    if resp.status_code == 404:
+        return rebuild_manifest(), None
+    resp.raise_for_status()
+    body = resp.json()
+    return json.loads(base64.b64decode(body['content'])), body.get('sha')
+
+def latest_url(kind="combined_nepse"):
+    try:
+        manifest, _ = fetch_manifest()
+        date, entry = latest_entry(manifest, kind)
+        if entry is None:
+            raise ValueError(f"No {kind}_*.csv file in the manifest")
+        print(f"📂 Latest GitHub file found: {entry['file']}")
+        return f"{RAW_BASE}/{entry['file']}"
+    except Exception as e:
+        print(f"⚠️ Failed to fetch latest {kind} file: {e}")
+        return None
+
+# -------------------- Write --------------------
+def dump_manifest(manifest):
+    return json.dumps(manifest, indent=1, sort_keys=True).encode()
+
+# -------------------- Publish a Run --------------------
+# everything a run publishes goes into ONE commit: the files, the manifest entries of the dated
+# ones and the run ledger. files: {repo path: (local file, ledger stage)}; a file whose content
+# was already published under its stage is left out, and nothing is committed if none changed
+def publish_outputs(ledger, files, message):
+    staged = {}
+    for repo_file, (local_file, stage) in files.items():
+        if not os.path.exists(local_file):
+            continue
+        digest = file_hash(local_file)
+        if ledger.unchanged(stage, digest):
+            ledger.skip(stage, f"'{local_file}' is identical to the last upload")
+            continue
+        ledger.record(stage, digest, digest)
+        staged[repo_file] = (local_file, stage)
+    if not staged:
+        return True
+
+    def build():
+        manifest, _ = fetch_manifest()
+        changes, dated = {}, False
+        for repo_file, (local_file, _) in staged.items():
+            with open(local_file, "rb") as f:
+                changes[repo_file] = f.read()
+            if os.path.dirname(repo_file) == UPLOAD_FOLDER:
+                dated = add_entry(manifest, repo_file, git_blob_sha(changes[repo_file]), len(changes[repo_file])) or dated
+        if dated:
+            changes[f"{UPLOAD_FOLDER}/{MANIFEST_FILE}"] = dump_manifest(manifest)
+        with open(ledger.path, "rb") as f:
+            changes[ledger.path] = f.read()
+        return changes
+
+    if commit_files(build, message):
+        return True
+    for _, stage in staged.values():
+        ledger.revert(stage)
+    return False
@@ -12,41 +12,16 @@ except ModuleNotFoundError:
 import pandas as pd
 from datetime import datetime
 import os
-
-# -------------------- Create Scraper Object --------------------
-request_obj = Nepse_scraper()
+from fetch import fetch_today_price
+from decoder import decode_today_price
 
 # -------------------- Fetch Today's Price Data --------------------
-try:
-    today_price = request_obj.get_today_price()
-    content_data = today_price.get('content', [])
-except Exception as e:
-    print(f"⚠️ Failed to fetch today's data: {e}")
-    content_data = []
+# bounded by FETCH_DEADLINE; falls back to the last good snapshot if NEPSE does not answer
+content_data, fetch_source = fetch_today_price(lambda: Nepse_scraper())
 
 # -------------------- Process Data --------------------
-filtered_data = []
-
-# Columns (without High, Low, and Percent Change)
-columns = ['Symbol', 'Date', 'Open', 'Close', 'Volume']
-
-for item in content_data:
-    symbol = item.get('symbol', '')
-    date = item.get('businessDate', '')
-    open_price = item.get('openPrice', 0)
-    close_price = item.get('closePrice', 0)
-    volume_daily = item.get('totalTradedQuantity', 0)  # traded quantity
-
-    filtered_data.append({
-        'Symbol': symbol,
-        'Date': date,
-        'Open': open_price,
-        'Close': close_price,
-        'Volume': volume_daily
-    })
-
-# -------------------- Create DataFrame --------------------
-df = pd.DataFrame(filtered_data, columns=columns)
+# every field of the payload schema (High, Low, LTP, previous close, turnover, trades included)
+df = decode_today_price(content_data)
 
 # Optional: sort by Symbol
 df = df.sort_values(by='Symbol')
@@ -75,85 +50,49 @@ except ModuleNotFoundError:
     from nepse_scraper import NepseScraper
 
 # -------------------- Imports --------------------
+import sys
 import pandas as pd
 import requests
-import re
 from datetime import datetime
 import urllib3
+from aggregates import TIMEFRAMES, build_bars, update_bars, bar_indicators, save_bars
+from github_utils import read_published_csv
+from fetch import fetch_today_price
+from ledger import RunLedger, content_hash, file_hash, business_date_of
+from decoder import decode_today_price, HISTORY_COLUMNS
+from backend import get_backend
+from floorsheet import FloorsheetAggregator, scraper_pages, save_aggregates
+from manifest import latest_url, publish_outputs
 
 # -------------------- Disable SSL warnings --------------------
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # -------------------- Config --------------------
-COLUMNS = ['Symbol', 'Date', 'Open', 'Close', 'Volume']
-REPO_URL = "https://api.github.com/repos/ChintanKoirala/NepseAnalysis/contents/daily_data"
-RAW_BASE = "https://raw.githubusercontent.com/ChintanKoirala/NepseAnalysis/main/daily_data"
+COLUMNS = HISTORY_COLUMNS
 MAX_DAYS = 60  # keep only latest 60 unique days
-
-# -------------------- Find Latest combined_nepse File --------------------
-def get_latest_combined_url():
-    try:
-        resp = requests.get(REPO_URL, verify=False)
-        resp.raise_for_status()
-        files = resp.json()
-
-        combined_files = [
-            f["name"] for f in files
-            if f["name"].startswith("combined_nepse_") and f["name"].endswith(".csv")
-        ]
-
-        if not combined_files:
-            raise ValueError("No combined_nepse file found")
-
-        dates = []
-        for fname in combined_files:
-            match = re.search(r"combined_nepse_(\d{4}-\d{2}-\d{2})\.csv", fname)
-            if match:
-                dates.append((match.group(1), fname))
-
-        if not dates:
-            raise ValueError("No valid dated files found")
-
-        latest_date, latest_file = max(dates, key=lambda x: x[0])
-        print(f"📂 Latest GitHub file found: {latest_file}")
-        return f"{RAW_BASE}/{latest_file}"
-
-    except Exception as e:
-        print(f"⚠️ Failed to fetch latest combined file: {e}")
-        return None
-
-LATEST_URL = get_latest_combined_url()
+BACKEND = 'pandas'  # or 'polars' (lazy queries; falls back to pandas if not installed)
+INGEST_FLOORSHEET = True  # per-symbol / per-broker aggregates of today's trades
 
 # -------------------- Fetch Today's NEPSE Data --------------------
-scraper = NepseScraper(verify_ssl=False)
-
-try:
-    today_data = scraper.get_today_price()
-
-    # ✅ FIX: Works for both list and dict responses
-    if isinstance(today_data, dict):
-        content = today_data.get('content', [])
-    elif isinstance(today_data, list):
-        content = today_data
-    else:
-        content = []
-
-except Exception as e:
-    print(f"⚠️ Failed to fetch today's NEPSE data: {e}")
-    content = []
+# bounded by FETCH_DEADLINE; falls back to the last good snapshot if NEPSE does not answer
+content, fetch_source = fetch_today_price(lambda: NepseScraper(verify_ssl=False))
+
+# -------------------- Run Ledger --------------------
+# a payload that was already turned into published output is not fetched from GitHub or processed again
+ledger = RunLedger("nepsedatalast3month", business_date_of(content))
+payload_digest = content_hash(content)
+if content and ledger.unchanged('compute', payload_digest) and ledger.unchanged('publish', ledger.output_of('compute')):
+    ledger.skip('compute', f"payload for {ledger.business_date} is unchanged")
+    ledger.skip('publish', "output for this payload is already published")
+    ledger.report()
+    sys.exit(0)
+
+# the manifest names the newest combined file, so daily_data is not listed
+LATEST_URL = latest_url("combined_nepse")
 
 # -------------------- Process Today's Data --------------------
-filtered_data = []
-for item in content:
-    filtered_data.append({
-        'Symbol': item.get('symbol', ''),
-        'Date': item.get('businessDate', ''),
-        'Open': item.get('openPrice', 0),
-        'Close': item.get('closePrice', 0),
-        'Volume': item.get('totalTradedQuantity', 0)
-    })
-
-df_today = pd.DataFrame(filtered_data, columns=COLUMNS)
+# High/Low/LTP/previous close/turnover/trades are kept in the history from now on
+df_today = decode_today_price(content)[COLUMNS]
 
 # -------------------- Save Today's File --------------------
 if not df_today.empty:
@@ -172,32 +111,50 @@ if not df_today.empty and LATEST_URL:
         # Keep only expected columns
         df_latest = df_latest[[col for col in COLUMNS if col in df_latest.columns]]
 
-        # Combine old + new
-        df_combined = pd.concat([df_latest, df_today], ignore_index=True)
-
-        # Remove duplicates
-        df_combined.drop_duplicates(subset=['Symbol', 'Date'], keep='last', inplace=True)
-
-        # Convert date
-        df_combined['Date'] = pd.to_datetime(df_combined['Date'], errors='coerce')
-
-        # Sort descending
-        df_combined.sort_values(by='Date', ascending=False, inplace=True)
-
-        # Keep only last MAX_DAYS unique dates
-        recent_dates = df_combined['Date'].dropna().unique()[:MAX_DAYS]
-        df_combined = df_combined[df_combined['Date'].isin(recent_dates)]
+        # Combine old + new, drop duplicates, newest first, only the last MAX_DAYS unique dates
+        df_combined = get_backend(BACKEND).merge_history([df_latest, df_today], newest_days=MAX_DAYS)
 
         # Format back to string
         df_combined['Date'] = df_combined['Date'].dt.strftime('%Y-%m-%d')
 
         # Save combined file
         df_combined.to_csv("combined_nepse.csv", index=False)
+        ledger.record('compute', payload_digest, file_hash("combined_nepse.csv"))
         print(f"✅ Combined CSV updated (last {MAX_DAYS} days kept)")
 
     except Exception as e:
         print(f"⚠️ Failed to merge with GitHub CSV: {e}")
 
+    # -------------------- Weekly / Monthly Bars --------------------
+    # only the current week/month bucket is updated with today's rows; when the published bars
+    # cannot be read (anything but "not published yet") they are left alone this run
+    for name, tf in TIMEFRAMES.items():
+        try:
+            bars = read_published_csv(tf['file'])
+            history = pd.read_csv("combined_nepse.csv")
+            if bars is None or bars.empty:
+                # first run: build the bars from the history we already have
+                bars = build_bars(history, tf['freq'])
+            else:
+                # today's week/month bucket is rebuilt from the merged daily rows
+                bars = update_bars(bars, history, tf['freq'], dates=df_today['Date'])
+            save_bars(bar_indicators(bars, tf['unit']), tf['file'])
+        except Exception as e:
+            print(f"⚠️ Failed to update {name} bars, published '{tf['file']}' left unchanged: {e}")
+            # the payload is not marked as done, so a rerun of it updates the bars
+            ledger.revert('compute')
+
+# -------------------- Floorsheet Aggregates --------------------
+# today's trades are folded in page by page; only the per-symbol / per-broker totals are kept
+floorsheet_files = []
+if INGEST_FLOORSHEET and not df_today.empty:
+    try:
+        aggregator = FloorsheetAggregator()
+        aggregator.consume(scraper_pages(NepseScraper(verify_ssl=False)))
+        floorsheet_files = save_aggregates(aggregator, df_today['Date'].max())
+    except Exception as e:
+        print(f"⚠️ Failed to ingest the floorsheet: {e}")
+
 
 
 
@@ -215,66 +172,20 @@ repo = "ChintanKoirala/NepseAnalysis"
 branch = "main"
 local_file = "combined_nepse.csv"
 repo_file = f"daily_data/combined_nepse_{datetime.today().strftime('%Y-%m-%d')}.csv"
-upload_url = f"https://api.github.com/repos/{repo}/contents/{repo_file}"
-
-# -------------------- Get GitHub Token --------------------
-token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_PAT")
-if not token:
-    print("❌ GitHub token not found. Set GITHUB_TOKEN (Actions) or GH_PAT (local).")
-    sys.exit(1)
-else:
-    print("✅ Using GitHub token.")
-
-headers = {
-    "Authorization": f"Bearer {token}",
-    "Accept": "application/vnd.github.v3+json"
-}
 
 # -------------------- Check local file --------------------
 if not os.path.exists(local_file):
     print(f"⚠️ Local file '{local_file}' does not exist. Exiting.")
     sys.exit(1)
 
-# -------------------- Read & encode file --------------------
-try:
-    with open(local_file, "rb") as f:
-        content = f.read()
-    encoded_content = base64.b64encode(content).decode()
-    print(f"ℹ️ File '{local_file}' read successfully.")
-except Exception as e:
-    print(f"❌ Failed to read '{local_file}': {e}")
-    sys.exit(1)
-
-# -------------------- Check if file exists in repo --------------------
-sha = None
-try:
-    response = requests.get(upload_url, headers=headers)
-    if response.status_code == 200:
-        sha = response.json().get("sha")
-        print(f"ℹ️ File '{repo_file}' exists in repo. It will be updated.")
-    elif response.status_code == 404:
-        print(f"ℹ️ File '{repo_file}' does not exist in repo. It will be created.")
-    else:
-        print(f"⚠️ Unexpected status {response.status_code} when checking repo.")
-        print(response.json())
-except Exception as e:
-    print(f"⚠️ Failed to check file in repo: {e}")
-
-# -------------------- Upload / Update --------------------
-payload = {
-    "message": f"Upload {repo_file} {datetime.today().strftime('%Y-%m-%d')}",
-    "content": encoded_content,
-    "branch": branch
-}
-if sha:
-    payload["sha"] = sha
-
-try:
-    response = requests.put(upload_url, headers=headers, json=payload)
-    if response.status_code in [200, 201]:
-        print(f"✅ File '{repo_file}' uploaded successfully!")
-    else:
-        print(f"❌ Failed to upload '{repo_file}'. Status code: {response.status_code}")
-        print(response.json())
-except Exception as e:
-    print(f"❌ Exception during upload: {e}")
+# -------------------- Publish --------------------
+# combined file, weekly/monthly bars and floorsheet aggregates in one commit with the manifest
+# and the run ledger; a file identical to its last upload is left out
+outputs = {repo_file: (local_file, 'publish')}
+for name, tf in TIMEFRAMES.items():
+    outputs[f"daily_data/{tf['file']}"] = (tf['file'], f"publish_{name}_bars")
+for file_name in floorsheet_files:
+    outputs[f"daily_data/{file_name}"] = (file_name, f"publish_{file_name.rsplit('_', 1)[0]}")
+
+publish_outputs(ledger, outputs, f"Upload combined NEPSE data for {datetime.today().strftime('%Y-%m-%d')}")
+ledger.report()
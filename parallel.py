@@ -0,0 +1,122 @@
+# this code runs a per-symbol row builder over the whole panel, optionally sharded across worker processes
+
+# -------------------- Imports --------------------
+import os
+import sys
+import time
+import heapq
+import multiprocessing
+from multiprocessing import shared_memory
+import pandas as pd
+import numpy as np
+
+# -------------------- Shard Planning --------------------
+# greedy longest-first packing: each symbol goes to the shard with the fewest rows so far
+def plan_shards(row_counts, shards):
+    heap = [(0, i) for i in range(shards)]
+    plan = [[] for _ in range(shards)]
+    for sym_idx in np.argsort(-np.asarray(row_counts), kind='stable'):
+        load, shard = heapq.heappop(heap)
+        plan[shard].append(int(sym_idx))
+        heapq.heappush(heap, (load + int(row_counts[sym_idx]), shard))
+    return [sorted(p) for p in plan if p]
+
+# -------------------- Shared-memory Panel --------------------
+# numeric columns go into one float64 block and dates/row labels into one int64 block, so the
+# workers attach to the same memory instead of receiving pickled frames
+def _share(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+def _shard_worker(task):
+    (float_name, float_shape, int_name, int_shape, columns, symbols, bounds, sym_ids, func, kwargs) = task
+    started = time.perf_counter()
+    float_shm, values = _attach(float_name, float_shape, np.float64)
+    int_shm, keys = _attach(int_name, int_shape, np.int64)
+    out = []
+    try:
+        for sym_idx in sym_ids:
+            a, b = bounds[sym_idx], bounds[sym_idx + 1]
+            data = {'Symbol': symbols[sym_idx], 'Date': keys[a:b, 0].astype('datetime64[ns]')}
+            for j, col in enumerate(columns):
+                data[col] = values[a:b, j].copy()
+            group = pd.DataFrame(data, index=keys[a:b, 1].copy())
+            row = func(group, **kwargs)
+            if row is not None:
+                out.append((sym_idx, row))
+    finally:
+        del values, keys
+        float_shm.close()
+        int_shm.close()
+    return out, time.perf_counter() - started
+
+# -------------------- Map over Symbols --------------------
+# returns the non-empty rows of func(group) in symbol order, whatever the number of workers
+def map_symbols(panel, func, workers=1, **kwargs):
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        rows = []
+        for symbol, group in panel.groupby('Symbol'):
+            row = func(group, **kwargs)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    panel = panel.sort_values(by='Symbol', kind='stable')
+    columns = [c for c in panel.columns
+               if c not in ('Symbol', 'Date') and pd.api.types.is_numeric_dtype(panel[c])]
+    symbols, starts, counts = np.unique(panel['Symbol'].values.astype(str), return_index=True, return_counts=True)
+    bounds = np.append(starts, len(panel))
+
+    float_shm = _share(panel[columns].to_numpy(dtype=np.float64))
+    int_shm = _share(np.column_stack([
+        pd.to_datetime(panel['Date']).values.astype('datetime64[ns]').astype(np.int64),
+        panel.index.values.astype(np.int64),
+    ]))
+    try:
+        tasks = [(float_shm.name, (len(panel), len(columns)), int_shm.name, (len(panel), 2),
+                  columns, symbols, bounds, shard, func, kwargs)
+                 for shard in plan_shards(counts, workers)]
+        # fork: workers must not re-import (and re-run) the calling script
+        with multiprocessing.get_context('fork').Pool(processes=len(tasks)) as pool:
+            results = pool.map(_shard_worker, tasks)
+    finally:
+        float_shm.close()
+        float_shm.unlink()
+        int_shm.close()
+        int_shm.unlink()
+
+    merged = sorted((item for out, _ in results for item in out), key=lambda item: item[0])
+    return [row for _, row in merged]
+
+# -------------------- Scaling Report --------------------
+# speedups are against a measured 1-worker (serial) run, which is always part of the report
+def scaling_report(panel, func, worker_counts=None, **kwargs):
+    worker_counts = sorted({1} | set(worker_counts or [2, 4, os.cpu_count() or 1]))
+    timings = []
+    for workers in worker_counts:
+        started = time.perf_counter()
+        map_symbols(panel, func, workers=workers, **kwargs)
+        timings.append((workers, time.perf_counter() - started))
+    base = timings[0][1]
+    report = pd.DataFrame(timings, columns=['Workers', 'Seconds'])
+    report['Speedup'] = (base / report['Seconds']).round(2)
+    report['Efficiency'] = (report['Speedup'] / report['Workers']).round(2)
+    print(report.to_string(index=False))
+    return report
+
+# usage: python parallel.py combined_nepse.csv [workers ...]
+if __name__ == "__main__":
+    from pipeline import signal_row, completedata_row
+
+    history = pd.read_csv(sys.argv[1])
+    history['Date'] = pd.to_datetime(history['Date'], errors='coerce')
+    history.sort_values(by=['Symbol', 'Date'], inplace=True)
+    counts = [int(n) for n in sys.argv[2:]] or None
+    for func in (signal_row, completedata_row):
+        print(f"⏱️ {func.__name__}: {history['Symbol'].nunique()} symbols, {len(history)} rows")
+        scaling_report(history, func, counts)
@@ -0,0 +1,97 @@
+# this code holds the per-symbol row builders behind filtered_nepse_signals.csv and completedata.csv
+
+# -------------------- Imports --------------------
+import pandas as pd
+import numpy as np
+from indicators import RSI_PERIOD, calculate_rsi_standard, rsi_last_values, add_moving_averages
+from trading_calendar import align_to_sessions
+
+# -------------------- Signal Classes --------------------
+SIGNAL_ORDER = [
+    'Very Strong Buy', 'Strong Buy', 'Overbought – Ready to Sell',
+    'Very Strong Sell', 'Strong Sell',
+    'Buy Zone', 'Sell Zone', 'Hold'
+]
+
+SIGNAL_COLUMNS = ['Symbol', 'Date', 'Open', 'Close', 'Volume', 'Avg_Vol_9D', 'MA_3D', 'MA_9D',
+                  'RSI_14D_Last', 'RSI_14D_1DayBefore', 'RSI_14D_2DaysBefore', 'Remarks']
+
+# Remarks logic
+def update_remarks(row):
+    rsi_last = row['RSI_14D_Last']
+    rsi_prev1 = row['RSI_14D_1DayBefore']
+    rsi_prev2 = row['RSI_14D_2DaysBefore']
+    ma3, ma9 = row['MA_3D'], row['MA_9D']
+    vol_ratio = row['Vol_Ratio']
+    vol, avg_vol = row['Volume'], row['Avg_Vol_9D']
+    remark = ''
+
+    # Buy Zone
+    if ma3 >= ma9 and vol_ratio >= 0.4:
+        if (rsi_last < 60) and (rsi_last > rsi_prev1 > rsi_prev2) and (vol_ratio >= 1.5):
+            remark = 'Very Strong Buy'
+        elif (rsi_last < 60) and (rsi_last > rsi_prev1 > rsi_prev2) and (vol_ratio >= 1.0):
+            remark = 'Strong Buy'
+        elif rsi_last >= 60:
+            remark = 'Overbought – Ready to Sell'
+        else:
+            remark = 'Buy Zone'
+    # Sell Zone
+    elif ma3 <= ma9 and vol_ratio < 3.0:
+        if (rsi_last < 70) and (rsi_last < rsi_prev1 < rsi_prev2) and (vol <= 0.7 * avg_vol):
+            remark = 'Very Strong Sell'
+        elif (rsi_last < 70) and (rsi_last < rsi_prev1 < rsi_prev2) and (vol <= avg_vol):
+            remark = 'Strong Sell'
+        else:
+            remark = 'Sell Zone'
+    else:
+        remark = 'Hold'
+    return remark
+
+# -------------------- filtered_nepse_signals.csv row --------------------
+# last row of one symbol with MAs, RSI of the last three days and Remarks; None if history is too short
+def signal_row(group, calendar=None):
+    group = group.copy()
+    if calendar is not None:
+        group = align_to_sessions(group, calendar)
+    group = add_moving_averages(group)
+    if len(group) < RSI_PERIOD + 3:
+        return None
+
+    rsi_series = calculate_rsi_standard(group['Close'].values, period=RSI_PERIOD)
+    last_row = group.iloc[[-1]].copy()
+    last_row['RSI_14D_Last'] = rsi_series.iloc[-1]
+    last_row['RSI_14D_1DayBefore'] = rsi_series.iloc[-2]
+    last_row['RSI_14D_2DaysBefore'] = rsi_series.iloc[-3]
+    last_row['Remarks'] = last_row.apply(update_remarks, axis=1)
+    return last_row
+
+# -------------------- completedata.csv row --------------------
+def completedata_row(group, calendar=None, period=RSI_PERIOD):
+    group = group.copy().sort_values(by='Date')
+    if calendar is not None:
+        group = align_to_sessions(group, calendar)
+
+    closes = pd.to_numeric(group['Close'], errors='coerce').dropna()
+    if len(closes) < period + 3:
+        return None
+
+    rsi_values = rsi_last_values(closes, period=period)
+
+    last_row = group.iloc[[-1]].copy()
+    last_row['Avg_Vol_9D'] = group['Volume'].rolling(9).mean().iloc[-1]
+    last_row['MA_3D'] = group['Close'].rolling(3).mean().iloc[-1]
+    last_row['MA_9D'] = group['Close'].rolling(9).mean().iloc[-1]
+
+    last_row['Rsi_14D_Last'] = rsi_values[0]
+    last_row['Rsi_14D_1D_Before'] = rsi_values[1]
+    last_row['Rsi_14D_2D_Before'] = rsi_values[2]
+    return last_row
+
+# -------------------- Raw Values for Published Rows --------------------
+# rows are computed on adjusted prices; the published row keeps the traded (unadjusted) values
+def restore_raw(rows, raw, columns=('Open', 'Close', 'Volume')):
+    columns = list(columns)
+    if not rows.empty:
+        rows[columns] = raw.loc[rows.index, columns]
+    return rows
@@ -0,0 +1,65 @@
+# this code ranks every symbol against the rest of the market on each trading day
+
+# -------------------- Imports --------------------
+import sys
+import pandas as pd
+import numpy as np
+from indicators import panel_indicators
+
+# -------------------- Config --------------------
+MOMENTUM_DAYS = [5, 20]
+TOP_N = 10
+# percentile 0-100 (higher = stronger RSI); ranks 1 = strongest, ties share the best rank;
+# a symbol without enough history stays unranked (NaN, written blank)
+RANK_COLUMNS = ['RSI_Pctl', 'Mom_5D_Rank', 'Mom_20D_Rank', 'Vol_Ratio_Rank']
+
+# -------------------- Cross-sectional Ranks --------------------
+# one vectorized pass over the whole Date x Symbol panel; NaN inputs (short history) stay unranked
+def cross_sectional_ranks(panel):
+    frame = panel_indicators(panel)
+    by_symbol = frame.groupby('Symbol', sort=False)
+    for days in MOMENTUM_DAYS:
+        frame[f'Mom_{days}D'] = frame['Close'] / by_symbol['Close'].shift(days) - 1
+    avg_vol = by_symbol['Volume'].rolling(9).mean().reset_index(level=0, drop=True)
+    frame['Vol_Ratio'] = frame['Volume'] / avg_vol.replace(0, np.nan)
+
+    by_date = frame.groupby('Date')
+    frame['RSI_Pctl'] = by_date['RSI'].rank(pct=True, method='average') * 100
+    for days in MOMENTUM_DAYS:
+        frame[f'Mom_{days}D_Rank'] = by_date[f'Mom_{days}D'].rank(ascending=False, method='min')
+    frame['Vol_Ratio_Rank'] = by_date['Vol_Ratio'].rank(ascending=False, method='min')
+    return frame[['Symbol', 'Date', 'RSI', 'Vol_Ratio'] + [f'Mom_{d}D' for d in MOMENTUM_DAYS] + RANK_COLUMNS]
+
+# the rank columns for each output row's own Symbol/Date
+def add_ranks(rows, panel):
+    if rows.empty:
+        return rows.reindex(columns=list(rows.columns) + RANK_COLUMNS)
+    ranks = cross_sectional_ranks(panel)[['Symbol', 'Date'] + RANK_COLUMNS]
+    keys = pd.DataFrame({'Symbol': rows['Symbol'].values, 'Date': pd.to_datetime(rows['Date']).values})
+    matched = keys.merge(ranks, on=['Symbol', 'Date'], how='left')
+    for col in RANK_COLUMNS:
+        rows[col] = matched[col].values
+    return rows
+
+# -------------------- Top / Bottom N --------------------
+# argpartition finds the n extremes in O(len) and only those n are sorted; NaN never qualifies
+def top_n(frame, column, n=TOP_N, largest=True):
+    values = frame[column].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    n = min(n, len(valid))
+    if n == 0:
+        return frame.iloc[0:0]
+    keyed = -values[valid] if largest else values[valid]
+    picked = valid[np.argpartition(keyed, n - 1)[:n]] if n < len(valid) else valid
+    picked = picked[np.argsort(-values[picked] if largest else values[picked], kind='stable')]
+    return frame.iloc[picked]
+
+# usage: python ranks.py combined_nepse.csv [n]   (leaders and laggards of the latest day)
+if __name__ == "__main__":
+    ranks = cross_sectional_ranks(pd.read_csv(sys.argv[1]))
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else TOP_N
+    day = ranks[ranks['Date'] == ranks['Date'].max()]
+    for column, largest, title in [('Mom_5D', True, '5-day leaders'), ('Mom_5D', False, '5-day laggards'),
+                                   ('Mom_20D', True, '20-day leaders'), ('Vol_Ratio', True, 'volume ratio')]:
+        print(f"📊 Top {n} {title}")
+        print(top_n(day, column, n, largest)[['Symbol', column, 'RSI_Pctl', 'Mom_5D_Rank', 'Mom_20D_Rank']].round(4).to_string(index=False))
@@ -0,0 +1,279 @@
+# this code records the NEPSE and GitHub traffic of a pipeline run and replays it offline, counting calls and bytes
+
+# -------------------- Imports --------------------
+import io
+import os
+import sys
+import json
+import time
+import types
+import runpy
+import shutil
+import tempfile
+import threading
+from urllib.parse import urlencode, urlparse
+import requests
+import pandas as pd
+from fetch import PermanentFetchError
+
+# -------------------- Config --------------------
+# merge -> completedata -> signals -> publish -> prune, in the order the workflows run them
+PIPELINE = ['nepsedatalast3month.py', 'MAANDAV.py', 'EMAcrossover.py', 'delfile.py']
+CASSETTE_FILE = "cassette.json"
+REPORT_FILE = "{mode}_report.json"
+SCRAPER_CLASSES = ['Nepse_scraper', 'NepseScraper']
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+_real_request = requests.sessions.Session.request
+_real_read_csv = pd.read_csv
+
+# -------------------- Cassette --------------------
+# calls are keyed by method + URL + params (request bodies are ignored, so uploads still match);
+# repeated calls of one key are served in recorded order, the last one again once exhausted
+class Cassette:
+    def __init__(self, path):
+        self.path = path
+        self.calls = []
+        self.served = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        cassette = cls(path)
+        with open(os.path.join(path, CASSETTE_FILE)) as f:
+            cassette.calls = json.load(f)['calls']
+        return cassette
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, CASSETTE_FILE), "w") as f:
+            json.dump({'calls': self.calls}, f, indent=1)
+        print(f"✅ {len(self.calls)} calls recorded to '{self.path}'")
+
+    def add(self, key, kind, status, headers, body):
+        with self.lock:
+            name = f"{len(self.calls):05d}.bin"
+            os.makedirs(os.path.join(self.path, 'bodies'), exist_ok=True)
+            with open(os.path.join(self.path, 'bodies', name), "wb") as f:
+                f.write(body)
+            self.calls.append({'key': key, 'kind': kind, 'status': status, 'headers': headers, 'body': name})
+
+    def next(self, key):
+        with self.lock:
+            matches = [c for c in self.calls if c['key'] == key]
+            if not matches:
+                return None, None
+            i = self.served.get(key, 0)
+            self.served[key] = i + 1
+            call = matches[min(i, len(matches) - 1)]
+        with open(os.path.join(self.path, 'bodies', call['body']), "rb") as f:
+            return call, f.read()
+
+# -------------------- Network Accounting --------------------
+class Accounting:
+    def __init__(self):
+        self.rows = []
+        self.lock = threading.Lock()
+        self.script = None
+
+    def add(self, kind, key, sent, received, missing=False):
+        with self.lock:
+            self.rows.append({'Script': self.script, 'Kind': kind, 'Key': key,
+                              'Sent': sent, 'Received': received, 'Missing': missing})
+
+    def summary(self, timings):
+        calls = pd.DataFrame(self.rows, columns=['Script', 'Kind', 'Key', 'Sent', 'Received', 'Missing'])
+        by_script = calls.groupby(['Script', 'Kind']).agg(
+            Calls=('Key', 'size'), Sent=('Sent', 'sum'), Received=('Received', 'sum'), Missing=('Missing', 'sum'))
+        totals = {'calls': int(len(calls)), 'sent': int(calls['Sent'].sum()),
+                  'received': int(calls['Received'].sum()), 'missing': int(calls['Missing'].sum()),
+                  'seconds': round(sum(timings.values()), 2)}
+        return by_script, totals
+
+def _kind(url):
+    host = urlparse(url).netloc
+    if host == 'api.github.com':
+        return 'github-api'
+    if host == 'raw.githubusercontent.com':
+        return 'github-raw'
+    return host or 'other'
+
+def _http_key(method, url, params):
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return f"{method.upper()} {url}" + (f"?{query}" if query else "")
+
+def _body_size(kwargs):
+    if kwargs.get('json') is not None:
+        return len(json.dumps(kwargs['json']).encode())
+    data = kwargs.get('data')
+    return len(data) if isinstance(data, (bytes, str)) else 0
+
+# -------------------- HTTP Patch --------------------
+# every requests.get/put/delete goes through Session.request; pd.read_csv on a URL is routed
+# through requests as well, so raw.githubusercontent downloads are recorded and counted too
+def _install_http(mode, cassette, accounting):
+    def request(session, method, url, params=None, **kwargs):
+        key = _http_key(method, url, params)
+        sent = _body_size(kwargs)
+        if mode == 'record':
+            resp = _real_request(session, method, url, params=params, **kwargs)
+            body = resp.content
+            cassette.add(key, 'http', resp.status_code,
+                         {'Content-Type': resp.headers.get('Content-Type', '')}, body)
+            accounting.add(_kind(url), key, sent, len(body))
+            return resp
+
+        call, body = cassette.next(key)
+        resp = requests.models.Response()
+        resp.url = url
+        resp.request = requests.Request(method, url).prepare()
+        if call is None:
+            resp.status_code, body = 404, b'{"message": "Not Found (not in cassette)"}'
+        else:
+            resp.status_code = call['status']
+            resp.headers.update(call['headers'])
+        resp._content = body
+        resp._content_consumed = True
+        resp.encoding = 'utf-8'
+        accounting.add(_kind(url), key, sent, len(body), missing=call is None)
+        return resp
+
+    def read_csv(source, *args, **kwargs):
+        if isinstance(source, str) and source.startswith('http'):
+            resp = requests.get(source)
+            if resp.status_code != 200:
+                raise FileNotFoundError(f"HTTP {resp.status_code}: {source}")
+            return _real_read_csv(io.BytesIO(resp.content), *args, **kwargs)
+        return _real_read_csv(source, *args, **kwargs)
+
+    requests.sessions.Session.request = request
+    pd.read_csv = read_csv
+
+# a scraper call the cassette does not hold; replaying it again cannot help, so the fetch stops
+# retrying at once instead of running into FETCH_DEADLINE
+class NotInCassette(PermanentFetchError):
+    pass
+
+# -------------------- Scraper Patch --------------------
+# keyed by method name only: the package exposes the same class under both names
+def _scraper_key(method, args, kwargs):
+    return f"{method}({json.dumps([list(args), kwargs], default=str, sort_keys=True)})"
+
+# record: wraps the real scraper classes; replay: a stand-in module whose methods return the recording
+def _install_scraper(mode, cassette, accounting):
+    if mode == 'record':
+        try:
+            import nepse_scraper as module
+        except ModuleNotFoundError:
+            print("⚠️ nepse_scraper is not installed; scraper calls will not be recorded")
+            return
+        classes = {id(c): c for c in (getattr(module, n, None) for n in SCRAPER_CLASSES) if c is not None}
+        for cls in classes.values():
+            for name in [n for n in dir(cls) if not n.startswith('_') and callable(getattr(cls, n))]:
+                def wrapped(self, *args, _name=name, _real=getattr(cls, name), **kwargs):
+                    key = _scraper_key(_name, args, kwargs)
+                    result = _real(self, *args, **kwargs)
+                    body = json.dumps(result, default=str).encode()
+                    cassette.add(key, 'nepse', 200, {}, body)
+                    accounting.add('nepse', key, 0, len(body))
+                    return result
+                setattr(cls, name, wrapped)
+        return
+
+    class StandIn:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, name):
+            def method(*args, **kwargs):
+                key = _scraper_key(name, args, kwargs)
+                call, body = cassette.next(key)
+                accounting.add('nepse', key, 0, len(body or b''), missing=call is None)
+                if call is None:
+                    raise NotInCassette(f"{key} is not in the cassette")
+                return json.loads(body)
+            return method
+
+    module = types.ModuleType('nepse_scraper')
+    for cls_name in SCRAPER_CLASSES:
+        setattr(module, cls_name, StandIn)
+    sys.modules['nepse_scraper'] = module
+
+# -------------------- Run --------------------
+# each script runs in a scratch directory holding copies of the repo's top-level CSV inputs
+# (corporate actions, watchlists), so no state from earlier local runs leaks in
+def run_pipeline(mode, cassette_dir, scripts=PIPELINE, workdir=None):
+    # the scripts run in another directory, so a relative cassette path is fixed first
+    cassette_dir = os.path.abspath(cassette_dir)
+    cassette = Cassette(cassette_dir) if mode == 'record' else Cassette.load(cassette_dir)
+    accounting = Accounting()
+    _install_http(mode, cassette, accounting)
+    _install_scraper(mode, cassette, accounting)
+    if mode == 'replay':
+        os.environ.setdefault('GITHUB_TOKEN', 'replay')
+
+    workdir = workdir or tempfile.mkdtemp(prefix='nepse_replay_')
+    for name in os.listdir(REPO_DIR):
+        if name.endswith('.csv'):
+            shutil.copy(os.path.join(REPO_DIR, name), workdir)
+    sys.path.insert(0, REPO_DIR)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    timings = {}
+    try:
+        for script in scripts:
+            print(f"▶️ {mode}: {script}")
+            accounting.script = script
+            started = time.perf_counter()
+            try:
+                runpy.run_path(os.path.join(REPO_DIR, script), run_name='__main__')
+            except SystemExit:
+                pass
+            except Exception as e:
+                print(f"❌ {script} failed: {e}")
+            timings[script] = round(time.perf_counter() - started, 2)
+    finally:
+        os.chdir(cwd)
+        requests.sessions.Session.request = _real_request
+        pd.read_csv = _real_read_csv
+
+    if mode == 'record':
+        cassette.save()
+    by_script, totals = accounting.summary(timings)
+    print(by_script.to_string())
+    print(f"⏱️ {totals['seconds']}s, {totals['calls']} calls, {totals['sent']} bytes sent, "
+          f"{totals['received']} bytes received, {totals['missing']} not in cassette")
+    return {'totals': totals, 'timings': timings,
+            'calls': by_script.reset_index().to_dict(orient='records')}
+
+# -------------------- Regression Check --------------------
+# more calls or bytes than the baseline report means a new round trip crept in
+def compare_reports(report, baseline):
+    regressions = []
+    for field in ['calls', 'sent', 'received']:
+        now, before = report['totals'][field], baseline['totals'][field]
+        if now > before:
+            regressions.append(f"{field}: {before} -> {now}")
+    for line in regressions:
+        print(f"📈 Network regression, {line}")
+    if not regressions:
+        print("✅ No more network calls or bytes than the baseline")
+    return regressions
+
+# usage: python replay.py record|replay CASSETTE_DIR [--baseline=report.json] [script.py ...]
+# record runs against the live endpoints (uploads included); replay never leaves the machine.
+# cassettes/sample is a small recorded run (12 symbols, 30 days) of the first three scripts:
+#   python replay.py replay cassettes/sample nepsedatalast3month.py MAANDAV.py EMAcrossover.py
+# (delfile.py is left out: what it compacts depends on the day it runs)
+if __name__ == "__main__":
+    mode, cassette_dir = sys.argv[1], sys.argv[2]
+    options = [a for a in sys.argv[3:] if a.startswith('--')]
+    scripts = [a for a in sys.argv[3:] if not a.startswith('--')] or PIPELINE
+    baseline = next((a.split('=', 1)[1] for a in options if a.startswith('--baseline=')), None)
+
+    report = run_pipeline(mode, cassette_dir, scripts)
+    with open(os.path.join(cassette_dir, REPORT_FILE.format(mode=mode)), "w") as f:
+        json.dump(report, f, indent=1, default=str)
+    if baseline:
+        with open(baseline) as f:
+            sys.exit(1 if compare_reports(report, json.load(f)) else 0)
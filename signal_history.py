@@ -0,0 +1,238 @@
+# this code keeps every symbol's daily Remarks as run-length-encoded intervals and answers streak/transition queries
+
+# -------------------- Imports --------------------
+import io
+import os
+import sys
+import requests
+import pandas as pd
+import numpy as np
+from pipeline import SIGNAL_ORDER
+from github_utils import RAW_BASE
+
+# -------------------- Config --------------------
+SIGNAL_HISTORY_FILE = "signal_history.npz"
+STREAKS_FILE = "signal_streaks.csv"
+RUN_FIELDS = ['sym', 'cls', 'start', 'end', 'prev_end', 'days', 'prev']
+
+# dates are stored as days since epoch
+def _days(dates):
+    return pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]').astype(np.int64)
+
+def _dates(days):
+    return pd.to_datetime(np.asarray(days, dtype='datetime64[D]'))
+
+# -------------------- Store --------------------
+# one row per run: symbol, class, first/last session of the run, the run's end before its last
+# extension (so a re-run of the same day can be undone), sessions with that verdict, and the
+# index of the symbol's previous run (-1 for its first). `open` points at each symbol's current run.
+# A class holds until the next verdict, also across sessions the symbol did not trade.
+class SignalHistory:
+    def __init__(self):
+        self.symbols = []
+        self.index = {}
+        self.classes = list(SIGNAL_ORDER)
+        self.runs = {f: np.zeros(0, dtype=np.int64) for f in RUN_FIELDS}
+        self.open = np.zeros(0, dtype=np.int64)
+        self.sessions = np.zeros(0, dtype=np.int64)
+
+    def _positions(self, symbols):
+        new = [s for s in pd.unique(pd.Series(symbols, dtype=object)) if s not in self.index]
+        for s in new:
+            self.index[s] = len(self.symbols)
+            self.symbols.append(s)
+        if new:
+            self.open = np.concatenate([self.open, np.full(len(new), -1, dtype=np.int64)])
+        return np.array([self.index[s] for s in symbols], dtype=np.int64)
+
+    def _codes(self, remarks):
+        for r in pd.unique(pd.Series(remarks, dtype=object)):
+            if r not in self.classes:
+                self.classes.append(r)
+        lookup = {c: i for i, c in enumerate(self.classes)}
+        return np.array([lookup[r] for r in remarks], dtype=np.int64)
+
+    # undoes the last session: the runs it started are the tail of the arrays, the runs it
+    # extended get their previous end back
+    def _rollback(self):
+        day = self.sessions[-1]
+        runs = self.runs
+        first_new = int(np.searchsorted(runs['start'], day))   # runs are appended in date order
+        dropped = np.arange(first_new, len(runs['start']))
+        self.open[runs['sym'][dropped]] = runs['prev'][dropped]
+        for f in RUN_FIELDS:
+            runs[f] = runs[f][:first_new]
+        extended = np.flatnonzero(runs['end'] == day)
+        runs['end'][extended] = runs['prev_end'][extended]
+        runs['days'][extended] -= 1
+        self.sessions = self.sessions[:-1]
+
+    # adds one session's verdicts; the same day again replaces that day, an older day is ignored
+    def append(self, date, symbols, remarks):
+        day = int(_days([date])[0])
+        if len(self.sessions) and day < self.sessions[-1]:
+            print(f"⚠️ Signal history is already at {_dates(self.sessions[-1:])[0].date()}, {pd.Timestamp(date).date()} ignored")
+            return 0
+        if len(self.sessions) and day == self.sessions[-1]:
+            self._rollback()
+        frame = pd.DataFrame({'Symbol': list(symbols), 'Remarks': list(remarks)}).drop_duplicates('Symbol', keep='last')
+        pos, cls = self._positions(frame['Symbol'].tolist()), self._codes(frame['Remarks'].tolist())
+        self.sessions = np.append(self.sessions, day)
+
+        runs = self.runs
+        current = self.open[pos]
+        has = current >= 0
+        same = np.zeros(len(pos), dtype=bool)
+        same[has] = runs['cls'][current[has]] == cls[has]
+        extend = current[same]
+        runs['prev_end'][extend] = runs['end'][extend]
+        runs['end'][extend] = day
+        runs['days'][extend] += 1
+
+        fresh = ~same
+        count = int(fresh.sum())
+        new = {'sym': pos[fresh], 'cls': cls[fresh], 'start': np.full(count, day), 'end': np.full(count, day),
+               'prev_end': np.full(count, day), 'days': np.ones(count, dtype=np.int64), 'prev': current[fresh]}
+        first = len(runs['sym'])
+        for f in RUN_FIELDS:
+            runs[f] = np.concatenate([runs[f], new[f].astype(np.int64)])
+        self.open[pos[fresh]] = np.arange(first, first + count)
+        return count
+
+    # -------------------- Queries --------------------
+    def runs_frame(self):
+        runs = self.runs
+        return pd.DataFrame({
+            'Symbol': np.array(self.symbols, dtype=object)[runs['sym']] if len(runs['sym']) else [],
+            'Remarks': np.array(self.classes, dtype=object)[runs['cls']] if len(runs['cls']) else [],
+            'Start': _dates(runs['start']), 'End': _dates(runs['end']), 'Days': runs['days'],
+        })
+
+    # current run of every symbol; Active is False when the symbol had no verdict in the last session
+    def current_streaks(self, remarks=None):
+        has = np.flatnonzero(self.open >= 0)
+        run = self.open[has]
+        streaks = pd.DataFrame({
+            'Symbol': np.array(self.symbols, dtype=object)[has],
+            'Remarks': np.array(self.classes, dtype=object)[self.runs['cls'][run]],
+            'Since': _dates(self.runs['start'][run]),
+            'Days': self.runs['days'][run],
+            'Sessions': self._sessions_in(self.runs['start'][run], np.full(len(run), self.sessions[-1] if len(self.sessions) else 0)),
+            'Active': self.runs['end'][run] == (self.sessions[-1] if len(self.sessions) else -1),
+        })
+        if remarks is not None:
+            streaks = streaks[streaks['Remarks'] == remarks]
+        return streaks.sort_values(by=['Days', 'Symbol'], ascending=[False, True]).reset_index(drop=True)
+
+    # every class change whose new run starts in [start, end]
+    def transitions(self, start=None, end=None, from_remarks=None, to_remarks=None):
+        runs = self.runs
+        mask = runs['prev'] >= 0
+        if start is not None:
+            mask &= runs['start'] >= _days([start])[0]
+        if end is not None:
+            mask &= runs['start'] <= _days([end])[0]
+        if from_remarks is not None:
+            mask &= runs['cls'][np.where(runs['prev'] >= 0, runs['prev'], 0)] == self._lookup(from_remarks)
+        if to_remarks is not None:
+            mask &= runs['cls'] == self._lookup(to_remarks)
+        idx = np.flatnonzero(mask)
+        prev = runs['prev'][idx]
+        return pd.DataFrame({
+            'Symbol': np.array(self.symbols, dtype=object)[runs['sym'][idx]],
+            'Date': _dates(runs['start'][idx]),
+            'From': np.array(self.classes, dtype=object)[runs['cls'][prev]],
+            'To': np.array(self.classes, dtype=object)[runs['cls'][idx]],
+            'From_Days': runs['days'][prev],
+        }).sort_values(by=['Date', 'Symbol']).reset_index(drop=True)
+
+    # sessions each symbol spent in each class within [start, end] (runs clipped to the range)
+    def time_in_class(self, start=None, end=None):
+        runs = self.runs
+        lo = runs['start'] if start is None else np.maximum(runs['start'], _days([start])[0])
+        # a run lasts until the session before the next run of that symbol, the open run until the last session
+        until = np.full(len(runs['sym']), self.sessions[-1] if len(self.sessions) else 0)
+        nxt = np.full(len(runs['sym']), -1)
+        nxt[runs['prev'][runs['prev'] >= 0]] = np.flatnonzero(runs['prev'] >= 0)
+        has_next = nxt >= 0
+        until[has_next] = self.sessions[np.searchsorted(self.sessions, runs['start'][nxt[has_next]]) - 1]
+        hi = until if end is None else np.minimum(until, _days([end])[0])
+        spent = np.where(hi >= lo, self._sessions_in(lo, hi), 0)
+
+        table = np.zeros((len(self.symbols), len(self.classes)), dtype=np.int64)
+        np.add.at(table, (runs['sym'], runs['cls']), spent)
+        table = pd.DataFrame(table, index=pd.Index(self.symbols, name='Symbol'), columns=self.classes)
+        return table.loc[table.sum(axis=1) > 0, [c for c in self.classes if table[c].any()]]
+
+    def _sessions_in(self, lo, hi):
+        return np.searchsorted(self.sessions, hi, 'right') - np.searchsorted(self.sessions, lo, 'left')
+
+    def _lookup(self, remarks):
+        return self.classes.index(remarks) if remarks in self.classes else -1
+
+    # -------------------- State --------------------
+    def save(self, file_name=SIGNAL_HISTORY_FILE):
+        np.savez_compressed(file_name, symbols=np.array(self.symbols), classes=np.array(self.classes),
+                            open=self.open, sessions=self.sessions,
+                            **{f: self.runs[f].astype(np.int32) for f in RUN_FIELDS})
+
+    @classmethod
+    def load(cls, source=SIGNAL_HISTORY_FILE):
+        try:
+            data = np.load(source)
+            history = cls()
+            history.symbols = data['symbols'].tolist()
+            history.index = {s: i for i, s in enumerate(history.symbols)}
+            history.classes = data['classes'].tolist()
+            history.open = data['open'].astype(np.int64)
+            history.sessions = data['sessions'].astype(np.int64)
+            history.runs = {f: data[f].astype(np.int64) for f in RUN_FIELDS}
+            return history
+        except Exception as e:
+            print(f"⚠️ Could not load signal history: {e}")
+            return None
+
+# the local copy (kept by the workflow cache), else the published one, else a new store. A new
+# store is only started when nothing is published yet (404); any other failure raises, since a
+# fresh store published over the real one would wipe every recorded run
+def load_history(file_name=SIGNAL_HISTORY_FILE):
+    if os.path.exists(file_name):
+        history = SignalHistory.load(file_name)
+        if history is not None:
+            return history
+    resp = requests.get(f"{RAW_BASE}/{file_name}", timeout=30)
+    if resp.status_code == 404:
+        print("ℹ️ Starting a new signal history")
+        return SignalHistory()
+    resp.raise_for_status()
+    history = SignalHistory.load(io.BytesIO(resp.content))
+    if history is None:
+        raise ValueError(f"published '{file_name}' could not be loaded")
+    return history
+
+# -------------------- Daily Update --------------------
+# only symbols that traded on the signal date get a verdict for that session
+def update_signal_history(signals, file_name=SIGNAL_HISTORY_FILE):
+    history = load_history(file_name)
+    dates = pd.to_datetime(signals['Date'])
+    day = dates.max()
+    today = signals[dates == day]
+    started = history.append(day, today['Symbol'].tolist(), today['Remarks'].astype(str).tolist())
+    history.save(file_name)
+    print(f"ℹ️ Signal history: {len(history.sessions)} sessions, {len(history.runs['sym'])} runs, {started} new today")
+    return history
+
+# usage: python signal_history.py streaks [remarks]
+#        python signal_history.py transitions <start> <end> [from] [to]
+#        python signal_history.py time [start] [end]
+if __name__ == "__main__":
+    history = load_history()
+    command = sys.argv[1] if len(sys.argv) > 1 else "streaks"
+    args = [a or None for a in sys.argv[2:]]
+    if command == "streaks":
+        result = history.current_streaks(*args[:1])
+    elif command == "transitions":
+        result = history.transitions(*args[:4])
+    else:
+        result = history.time_in_class(*args[:2]).reset_index()
+    print(result.to_string(index=False))
@@ -0,0 +1,100 @@
+# this code keeps the NEPSE trading-session index used for session arithmetic and gap detection
+
+# -------------------- Imports --------------------
+import pandas as pd
+import numpy as np
+
+# -------------------- Config --------------------
+DEFAULT_WEEKMASK = 'Sun Mon Tue Wed Thu'
+EXTEND_SESSIONS = 30  # sessions projected past the last traded date
+
+def infer_weekmask(dates):
+    days = pd.to_datetime(pd.Series(dates)).dt.day_name().str[:3].unique()
+    order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    return ' '.join(day for day in order if day in days) or DEFAULT_WEEKMASK
+
+# -------------------- Trading Calendar --------------------
+# inside the history, a session is a date on which the market traded at all; after it,
+# sessions are projected from the weekmask minus the known holidays
+class TradingCalendar:
+    def __init__(self, sessions, holidays=()):
+        self.sessions = np.unique(pd.to_datetime(pd.Series(sessions)).values.astype('datetime64[D]'))
+        self.holidays = np.unique(pd.to_datetime(pd.Series(list(holidays))).values.astype('datetime64[D]'))
+
+    @classmethod
+    def from_history(cls, dates, holidays=(), weekmask=None, extend=EXTEND_SESSIONS):
+        observed = np.unique(pd.to_datetime(pd.Series(dates)).dropna().values.astype('datetime64[D]'))
+        weekmask = weekmask or infer_weekmask(observed)
+        holidays = np.unique(pd.to_datetime(pd.Series(list(holidays))).values.astype('datetime64[D]'))
+        future = np.busday_offset(observed[-1], np.arange(1, extend + 1), roll='forward',
+                                  weekmask=weekmask, holidays=holidays)
+        calendar = cls(np.concatenate([observed, future]), holidays)
+        calendar.last_observed = observed[-1]
+        calendar.weekmask = weekmask
+        # weekmask days inside the history on which nothing traded (holidays, closures)
+        expected = np.arange(observed[0], observed[-1] + 1, dtype='datetime64[D]')
+        expected = expected[np.is_busday(expected, weekmask=weekmask)]
+        calendar.closed_days = np.setdiff1d(expected, observed)
+        return calendar
+
+    def _days(self, dates):
+        return pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]')
+
+    # session number of each date; dates that are not sessions get -1
+    def ordinal(self, dates):
+        days = self._days(dates)
+        pos = np.searchsorted(self.sessions, days)
+        inside = pos < len(self.sessions)
+        found = np.zeros(len(days), dtype=bool)
+        found[inside] = self.sessions[pos[inside]] == days[inside]
+        return np.where(found, pos, -1)
+
+    # the session n sessions before (n > 0) or after (n < 0) each date; non-sessions roll back first
+    def sessions_back(self, dates, n):
+        pos = np.searchsorted(self.sessions, self._days(dates), side='right') - 1 - n
+        out = np.full(len(pos), np.datetime64('NaT'), dtype='datetime64[D]')
+        ok = (pos >= 0) & (pos < len(self.sessions))
+        out[ok] = self.sessions[pos[ok]]
+        return out
+
+    def sessions_between(self, start, end):
+        lo, hi = np.searchsorted(self.sessions, self._days([start, end]), side='left')
+        if hi < len(self.sessions) and self.sessions[hi] == self._days([end])[0]:
+            hi += 1
+        return self.sessions[lo:hi]
+
+    # -------------------- Gap Detection --------------------
+    # sessions between a symbol's first and last trade on which it did not trade
+    def missing_sessions(self, panel):
+        rows = pd.DataFrame({'Symbol': panel['Symbol'].values, 'Ord': self.ordinal(panel['Date'])})
+        rows = rows[rows['Ord'] >= 0].drop_duplicates().sort_values(by=['Symbol', 'Ord'])
+        prev = rows.groupby('Symbol')['Ord'].shift()
+        gaps = (rows['Ord'] - prev - 1).fillna(0).astype(int).values
+        has_gap = gaps > 0
+        if not has_gap.any():
+            return pd.DataFrame(columns=['Symbol', 'Date'])
+        counts = gaps[has_gap]
+        starts = (prev.values[has_gap] + 1).astype(int)
+        # starts repeated per missing session plus 0..count-1 offsets
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return pd.DataFrame({
+            'Symbol': np.repeat(rows['Symbol'].values[has_gap], counts),
+            'Date': pd.to_datetime(self.sessions[np.repeat(starts, counts) + offsets]),
+        })
+
+# -------------------- Session-aligned Windows --------------------
+# puts one symbol's rows on every session between its first and last trade so rolling(N)
+# covers N sessions: close carries forward, volume is 0, and original row labels are kept
+# for traded rows (filler sessions get -1)
+def align_to_sessions(group, calendar):
+    dates = pd.to_datetime(group['Date'])
+    sessions = pd.DatetimeIndex(calendar.sessions_between(dates.min(), dates.max()))
+    aligned = group.assign(Row=group.index).set_index(dates.values).reindex(sessions.union(pd.DatetimeIndex(dates.values)))
+    aligned['Traded'] = aligned['Symbol'].notna()
+    aligned['Symbol'] = group['Symbol'].iloc[0]
+    aligned['Date'] = aligned.index
+    aligned['Close'] = aligned['Close'].ffill()
+    aligned['Open'] = aligned['Open'].fillna(aligned['Close'])
+    aligned['Volume'] = aligned['Volume'].fillna(0)
+    aligned.index = aligned['Row'].fillna(-1).astype(int).values
+    return aligned.drop(columns='Row')